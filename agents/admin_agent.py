@@ -0,0 +1,47 @@
+from typing import Optional
+from mcp.server.fastmcp import FastMCP
+from . import profiler
+
+# Initialize FastMCP server
+mcp = FastMCP("spotify-admin")
+
+@mcp.tool()
+async def profile_tools(action: str = "start", calls: Optional[int] = 10, seconds: Optional[float] = None,
+                        stall_threshold_ms: float = 100, interval_ms: float = 5) -> str:
+    """Capture a sampling profile of the next tool calls to see where their time goes.
+    
+    Writes flamegraph-compatible collapsed stacks and event-loop stall reports to the
+    profiles directory (PROFILE_DIR). Profiling costs nothing while no capture is running.
+    
+    Args:
+        action: start, stop or status
+        calls: Stop after this many tool calls (optional, 0 or None for no call limit)
+        seconds: Stop after this many seconds (optional)
+        stall_threshold_ms: Report event-loop stalls longer than this many milliseconds
+        interval_ms: Sampling interval in milliseconds
+    """
+    action = action.lower()
+    session = profiler.current_session()
+    
+    if action == "start":
+        if not calls and not seconds:
+            return "Please provide calls or seconds to limit the capture."
+        if session is not None:
+            return "A profiling capture is already running. Use action 'stop' to end it."
+        profiler.start_session(calls or None, seconds, interval_ms / 1000, stall_threshold_ms / 1000)
+        limits = " or ".join(filter(None, [f"{calls} tool calls" if calls else None, f"{seconds:g} seconds" if seconds else None]))
+        return f"Profiling started for the next {limits}."
+    elif action == "stop":
+        if session is None:
+            return "No profiling capture is running."
+        session.finish()
+        return "Profiling stopped.\n\n" + session.summary()
+    elif action == "status":
+        if session is None:
+            last = profiler.last_session()
+            if last is None:
+                return "No profiling capture is running."
+            return "No profiling capture is running. Last capture:\n\n" + last.summary()
+        return "Profiling in progress.\n\n" + session.summary()
+    else:
+        return f"Unknown action: {action}. Supported actions are: start, stop, status"
@@ -1,5 +1,10 @@
+import asyncio
+from typing import Optional
 from mcp.server.fastmcp import FastMCP
 from .utils import get_spotify_client
+from .spotify_client import TRACK_MARKET
+from .feature_index import KEY_NAMES, camelot, parse_key
+from .library import get_library
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-analysis")
@@ -50,12 +55,12 @@ async def analyze_track(track_id_or_name: str) -> str:
     if track_id_or_name.startswith("spotify:track:") or (len(track_id_or_name) == 22 and all(c in "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz" for c in track_id_or_name)):
         track_id = track_id_or_name.split(":")[-1] if ":" in track_id_or_name else track_id_or_name
         try:
-            track = sp.track(track_id)
+            track = await asyncio.to_thread(sp.track, track_id, market=TRACK_MARKET)
         except:
             return f"Invalid track ID: {track_id_or_name}"
     else:
         # Search for the track
-        results = sp.search(q=track_id_or_name, type='track', limit=1)
+        results = await asyncio.to_thread(sp.search, q=track_id_or_name, type='track', limit=1, market=TRACK_MARKET)
         if not results['tracks']['items']:
             return f"No track found for query: {track_id_or_name}"
         track = results['tracks']['items'][0]
@@ -63,7 +68,7 @@ async def analyze_track(track_id_or_name: str) -> str:
     
     # Get audio features
     try:
-        track_features = sp.audio_features(track_id)[0]
+        track_features = (await asyncio.to_thread(sp.audio_features, track_id))[0]
         if not track_features:
             return f"No audio features available for track: {track['name']}"
         
@@ -91,4 +96,72 @@ Time Signature: {track_features['time_signature']}/4
         return response
     
     except Exception as e:
-        return f"Error analyzing track: {str(e)}" 
\ No newline at end of file
+        return f"Error analyzing track: {str(e)}" 
+
+@mcp.tool()
+async def find_tracks_by_features(min_tempo: Optional[float] = None, max_tempo: Optional[float] = None,
+                                  key: Optional[str] = None, harmonic: bool = False,
+                                  min_energy: Optional[float] = None, max_energy: Optional[float] = None,
+                                  min_valence: Optional[float] = None, max_valence: Optional[float] = None,
+                                  min_danceability: Optional[float] = None, max_danceability: Optional[float] = None,
+                                  limit: int = 20, refresh: bool = False) -> str:
+    """Find tracks in your playlists by tempo, key, energy, valence and danceability ranges.
+    
+    Args:
+        min_tempo: Minimum tempo in BPM (optional)
+        max_tempo: Maximum tempo in BPM (optional)
+        key: Musical key such as "A minor", "F#m", "Bb" or a Camelot code like "8A" (optional)
+        harmonic: Also include keys that mix harmonically with `key` (Camelot neighbours)
+        min_energy: Minimum energy from 0.0 to 1.0 (optional)
+        max_energy: Maximum energy from 0.0 to 1.0 (optional)
+        min_valence: Minimum positivity from 0.0 to 1.0 (optional)
+        max_valence: Maximum positivity from 0.0 to 1.0 (optional)
+        min_danceability: Minimum danceability from 0.0 to 1.0 (optional)
+        max_danceability: Maximum danceability from 0.0 to 1.0 (optional)
+        limit: Maximum number of tracks to list
+        refresh: Rebuild the library from Spotify instead of using the cached copy
+    """
+    code = None
+    if key:
+        code = parse_key(key)
+        if not code:
+            return f"Could not understand key: {key}. Use e.g. \"A minor\", \"F#m\", \"Bb\" or \"8A\"."
+    
+    sp = get_spotify_client()
+    
+    try:
+        store, index = await get_library(sp, refresh)
+        rows = index.query(
+            ranges={
+                "tempo": (min_tempo, max_tempo),
+                "energy": (min_energy, max_energy),
+                "valence": (min_valence, max_valence),
+                "danceability": (min_danceability, max_danceability)
+            },
+            key=code,
+            harmonic=harmonic
+        )
+        
+        if not rows:
+            return f"No tracks in your library ({len(store)} tracks) match these criteria."
+        
+        # Sorted by tempo, ready for sequencing
+        rows.sort(key=lambda row: store.feature(row, 'tempo') or 0.0)
+        
+        response = f"Found {len(rows)} matching tracks in your library of {len(store)} tracks"
+        response += f" (showing {limit}):\n\n" if len(rows) > limit else ":\n\n"
+        for i, row in enumerate(rows[:limit], 1):
+            track_key = store.feature(row, 'key')
+            track_mode = store.feature(row, 'mode')
+            if track_key is not None and track_key >= 0 and track_mode is not None:
+                key_desc = f"{KEY_NAMES[int(track_key)]} {['Minor', 'Major'][int(track_mode)]} ({camelot(int(track_key), int(track_mode))})"
+            else:
+                key_desc = "unknown key"
+            response += f"{i}. \"{store.names[row]}\" by {store.artists[row]}\n"
+            response += f"   {store.feature(row, 'tempo'):.1f} BPM, {key_desc}, energy {store.feature(row, 'energy'):.2f}\n"
+            response += f"   Spotify URI: spotify:track:{store.ids[row]}\n\n"
+        
+        return response
+    
+    except Exception as e:
+        return f"Error finding tracks: {str(e)}"
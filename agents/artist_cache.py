@@ -0,0 +1,113 @@
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter, OrderedDict
+from .playlist_writer import chunked
+
+# Spotify returns at most 50 artists per request
+ARTISTS_CHUNK = 50
+# Artist genres and popularity change slowly, so cached artists are reused for a day (seconds)
+ARTIST_TTL = 24 * 3600
+# Maximum number of cached artists; the least recently used are evicted first
+ARTIST_CACHE_SIZE = 20000
+
+class ArtistCache:
+    """Long-lived LRU cache of artist name, genres and popularity by artist ID.
+
+    Expired entries are dropped when they're looked up, and the cache never
+    holds more than `size` artists.
+    """
+
+    def __init__(self, ttl=ARTIST_TTL, size=ARTIST_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, artist_id):
+        entry = self.entries.get(artist_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl:
+            del self.entries[artist_id]
+            return None
+        self.entries.move_to_end(artist_id)
+        return entry[0]
+
+    def add(self, artist):
+        """Cache a spotipy artist object (full, with genres and popularity) and return its cached details."""
+        details = {
+            "name": artist['name'],
+            "genres": tuple(sys.intern(genre) for genre in artist.get('genres', [])),
+            "popularity": artist.get('popularity', 0)
+        }
+        self.entries[artist['id']] = (details, time.monotonic())
+        self.entries.move_to_end(artist['id'])
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return details
+
+ARTIST_CACHE = ArtistCache()
+
+async def fetch_artists(sp, artist_ids):
+    """Return artist details for the given IDs, fetching uncached ones in concurrent 50-ID batches.
+
+    Returns a dict mapping artist ID to a dict with name, genres and popularity.
+    """
+    artists = {}
+    missing = []
+    for artist_id in dict.fromkeys(artist_ids):
+        artist = ARTIST_CACHE.get(artist_id)
+        if artist is None:
+            missing.append(artist_id)
+        else:
+            artists[artist_id] = artist
+
+    batches = await asyncio.gather(*[
+        asyncio.to_thread(sp.artists, batch)
+        for batch in chunked(missing, ARTISTS_CHUNK)
+    ])
+    for batch in batches:
+        for artist in batch['artists']:
+            if artist:
+                artists[artist['id']] = ARTIST_CACHE.add(artist)
+    return artists
+
+async def enrich_tracks(sp, tracks):
+    """Compute genre and artist statistics for a list of spotipy track objects.
+
+    Every credited artist counts, not just the first one. A track counts once
+    towards each genre of any of its artists.
+
+    Returns a dict with:
+        genres: Counter of tracks per genre
+        artists: Counter of tracks per artist name
+        popularity: (min, median, max) artist popularity, or None
+        credits: Counter of tracks by number of credited artists
+    """
+    artist_ids = [a['id'] for t in tracks for a in t.get('artists', []) if a.get('id')]
+    artists = await fetch_artists(sp, artist_ids)
+
+    genres = Counter()
+    artist_tracks = Counter()
+    credits = Counter()
+    for track in tracks:
+        credited = list({a['id']: a for a in track.get('artists', []) if a.get('id')}.values())
+        credits[len(track.get('artists', []))] += 1
+        track_genres = set()
+        for artist in credited:
+            artist_tracks[artist['name']] += 1
+            if artist['id'] in artists:
+                track_genres.update(artists[artist['id']]['genres'])
+        genres.update(track_genres)
+
+    popularity = sorted(artist['popularity'] for artist in artists.values())
+    return {
+        "genres": genres,
+        "artists": artist_tracks,
+        "popularity": (popularity[0], statistics.median(popularity), popularity[-1]) if popularity else None,
+        "credits": credits
+    }
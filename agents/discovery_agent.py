@@ -1,7 +1,9 @@
+import asyncio
 from typing import Optional
 import spotipy
 from mcp.server.fastmcp import FastMCP
 from .utils import get_spotify_client
+from .spotify_client import TRACK_MARKET
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-discovery")
@@ -31,7 +33,7 @@ async def get_recommendations(seed_tracks: Optional[str] = None, seed_artists: O
     if seed_tracks:
         track_names = [t.strip() for t in seed_tracks.split(",")]
         for track_name in track_names[:2]:  # Limit to 2 seed tracks
-            results = sp.search(q=track_name, type='track', limit=1)
+            results = await asyncio.to_thread(sp.search, q=track_name, type='track', limit=1, market=TRACK_MARKET)
             if results['tracks']['items']:
                 params["seed_tracks"].append(results['tracks']['items'][0]['id'])
     
@@ -39,13 +41,13 @@ async def get_recommendations(seed_tracks: Optional[str] = None, seed_artists: O
     if seed_artists:
         artist_names = [a.strip() for a in seed_artists.split(",")]
         for artist_name in artist_names[:2]:  # Limit to 2 seed artists
-            results = sp.search(q=artist_name, type='artist', limit=1)
+            results = await asyncio.to_thread(sp.search, q=artist_name, type='artist', limit=1)
             if results['artists']['items']:
                 params["seed_artists"].append(results['artists']['items'][0]['id'])
     
     # If no seeds provided, use user's top tracks
     if not params["seed_tracks"] and not params["seed_artists"]:
-        top_tracks = sp.current_user_top_tracks(limit=2, time_range='medium_term')
+        top_tracks = await asyncio.to_thread(sp.current_user_top_tracks, limit=2, time_range='medium_term')
         if top_tracks['items']:
             params["seed_tracks"] = [track['id'] for track in top_tracks['items']]
     
@@ -73,7 +75,7 @@ async def get_recommendations(seed_tracks: Optional[str] = None, seed_artists: O
     clean_params = {k: v for k, v in params.items() if v is not None and (not isinstance(v, list) or len(v) > 0)}
     
     # Get recommendations
-    recommendations = sp.recommendations(**clean_params)
+    recommendations = await asyncio.to_thread(sp.recommendations, **clean_params)
     
     if not recommendations['tracks']:
         return "No recommendations found. Try different seed tracks or artists."
@@ -0,0 +1,125 @@
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# Features with a sorted range index
+INDEXED_FEATURES = ("tempo", "energy", "valence", "danceability")
+
+KEY_NAMES = ['C', 'C♯/D♭', 'D', 'D♯/E♭', 'E', 'F', 'F♯/G♭', 'G', 'G♯/A♭', 'A', 'A♯/B♭', 'B']
+PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+def float32(value):
+    """Round a bound to float32, the precision feature values are stored at, so comparisons are exact."""
+    return array("f", [value])[0] if value is not None else None
+
+def camelot(key: int, mode: int) -> str:
+    """Return the Camelot wheel code (e.g. "8A" for A minor) of a Spotify key and mode."""
+    if mode == 1:
+        return f"{(7 * key + 7) % 12 + 1}B"
+    return f"{(7 * key + 4) % 12 + 1}A"
+
+def camelot_neighbours(code: str):
+    """Return the codes that mix harmonically with `code`: itself, ±1 on the wheel and its relative major/minor."""
+    number, letter = int(code[:-1]), code[-1]
+    other = "A" if letter == "B" else "B"
+    return [code, f"{number % 12 + 1}{letter}", f"{(number - 2) % 12 + 1}{letter}", f"{number}{other}"]
+
+def parse_key(text: str):
+    """Parse a key such as "A minor", "F#m", "Bb", "C♯/D♭ major" or a Camelot code like "8A".
+
+    Returns its Camelot code, or None if it can't be parsed.
+    """
+    text = text.strip()
+    match = re.fullmatch(r"(1[0-2]|[1-9])\s*([abAB])", text)
+    if match:
+        return f"{match.group(1)}{match.group(2).upper()}"
+
+    match = re.fullmatch(r"([A-Ga-g])\s*([#♯b♭]?)(?:/[A-G][#♯b♭]?)?\s*(.*)", text)
+    if not match:
+        return None
+    pitch = PITCH_CLASSES[match.group(1).upper()]
+    if match.group(2) in ("#", "♯"):
+        pitch += 1
+    elif match.group(2) in ("b", "♭"):
+        pitch -= 1
+    mode_text = match.group(3).strip().lower()
+    if mode_text in ("m", "min", "minor"):
+        mode = 0
+    elif mode_text in ("", "maj", "major"):
+        mode = 1
+    else:
+        return None
+    return camelot(pitch % 12, mode)
+
+class FeatureIndex:
+    """Multi-attribute range index over the audio features in a TrackStore.
+
+    Every indexed feature gets a float32 array of its values in sorted order and
+    a parallel array of row numbers, so a range is two bisects. Keys are bucketed
+    by Camelot code. A query starts from the narrowest range or key bucket and
+    checks the remaining conditions directly against the store's feature columns.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.columns = {}
+        self.sorted = {}
+        for name in INDEXED_FEATURES:
+            column = store.column(name)
+            rows = sorted((row for row, value in enumerate(column) if not math.isnan(value)), key=column.__getitem__)
+            self.columns[name] = column
+            self.sorted[name] = (array("f", (column[row] for row in rows)), array("I", rows))
+
+        self.keys = defaultdict(list)
+        keys, modes = store.column("key"), store.column("mode")
+        for row, (key, mode) in enumerate(zip(keys, modes)):
+            if not (math.isnan(key) or math.isnan(mode)) and key >= 0:
+                self.keys[camelot(int(key), int(mode))].append(row)
+
+    def __len__(self):
+        return len(self.store)
+
+    def range(self, name, low=None, high=None):
+        """Return the row numbers whose `name` feature lies within [low, high]."""
+        values, rows = self.sorted[name]
+        low, high = float32(low), float32(high)
+        start = bisect_left(values, low) if low is not None else 0
+        stop = bisect_right(values, high) if high is not None else len(values)
+        return rows[start:stop]
+
+    def query(self, ranges=None, key=None, harmonic=False):
+        """Find the rows matching every range and, optionally, a key.
+
+        Args:
+            ranges: Dict mapping an indexed feature to a (low, high) pair; either bound may be None
+            key: Camelot code the tracks must be in
+            harmonic: Also accept keys that mix harmonically with `key`
+
+        Returns the matching row numbers. Tracks without audio features never match.
+        """
+        ranges = {
+            name: (float32(low), float32(high))
+            for name, (low, high) in (ranges or {}).items() if (low, high) != (None, None)
+        }
+        candidates = [self.range(name, low, high) for name, (low, high) in ranges.items()]
+        key_rows = None
+        if key:
+            codes = camelot_neighbours(key) if harmonic else [key]
+            key_rows = [row for code in codes for row in self.keys.get(code, [])]
+            candidates.append(key_rows)
+        if not candidates:
+            # Every track with audio features
+            return sorted(self.sorted["tempo"][1])
+
+        # Drive the query from the narrowest candidate list and check the rest per row
+        rows = min(candidates, key=len)
+        if key_rows is not None and rows is not key_rows:
+            key_set = set(key_rows)
+            rows = [row for row in rows if row in key_set]
+        checks = [(self.columns[name], low, high) for name, (low, high) in ranges.items()]
+        return [
+            row for row in rows
+            if all((low is None or column[row] >= low) and (high is None or column[row] <= high) for column, low, high in checks)
+        ]
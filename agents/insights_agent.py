@@ -1,6 +1,8 @@
+import asyncio
 from typing import Optional
 from mcp.server.fastmcp import FastMCP
 from .utils import get_spotify_client
+from .artist_cache import ARTIST_CACHE, fetch_artists
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-insights")
@@ -29,18 +31,27 @@ async def get_top_items(item_type: str = "tracks", time_range: str = "medium_ter
     
     try:
         if item_type == "tracks":
-            items = sp.current_user_top_tracks(limit=10, time_range=time_range)
+            items = await asyncio.to_thread(sp.current_user_top_tracks, limit=10, time_range=time_range)
             response = f"Your top tracks from the {time_range_desc[time_range]}:\n\n"
             
+            # Genres come from the tracks' artists, shared with playlist analysis through the artist cache
+            artist_details = await fetch_artists(sp, [a['id'] for item in items['items'] for a in item['artists'] if a.get('id')])
+            
             for i, item in enumerate(items['items'], 1):
                 artists = ", ".join([artist['name'] for artist in item['artists']])
+                track_genres = list(dict.fromkeys(
+                    genre for a in item['artists'] if a.get('id') in artist_details for genre in artist_details[a['id']]['genres']
+                ))
                 response += f"{i}. \"{item['name']}\" by {artists}\n"
-                response += f"   Album: {item['album']['name']}\n\n"
+                response += f"   Album: {item['album']['name']}\n"
+                response += f"   Genres: {', '.join(track_genres[:3]) if track_genres else 'No genres listed'}\n\n"
         else:  # artists
-            items = sp.current_user_top_artists(limit=10, time_range=time_range)
+            items = await asyncio.to_thread(sp.current_user_top_artists, limit=10, time_range=time_range)
             response = f"Your top artists from the {time_range_desc[time_range]}:\n\n"
             
             for i, item in enumerate(items['items'], 1):
+                # Full artist objects, so later playlist analyses can skip fetching them
+                ARTIST_CACHE.add(item)
                 genres = ", ".join(item['genres'][:3]) if item['genres'] else "No genres listed"
                 response += f"{i}. {item['name']}\n"
                 response += f"   Genres: {genres}\n"
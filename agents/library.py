@@ -0,0 +1,35 @@
+import asyncio
+import time
+from .track_store import TrackStore
+from .feature_index import FeatureIndex
+from .playlist_writer import fetch_user_playlists, fetch_playlist_items, fetch_audio_features
+
+# How long the library mirror is reused before it's rebuilt from Spotify (seconds)
+LIBRARY_TTL = 3600
+
+_library = {"loaded_at": 0.0, "store": None, "index": None}
+_library_lock = asyncio.Lock()
+
+async def load_library(sp):
+    """Mirror every track in the user's playlists, with audio features, into a TrackStore."""
+    playlists = await fetch_user_playlists(sp)
+    contents = await asyncio.gather(*[fetch_playlist_items(sp, playlist_id) for playlist_id, _ in playlists])
+
+    store = TrackStore()
+    for items, _ in contents:
+        for item in items:
+            if item['track'] and item['track']['id']:
+                store.add(item['track'])
+
+    features = await fetch_audio_features(sp, store.ids)
+    for track_id, track_features in features.items():
+        store.set_features(track_id, track_features)
+    return store
+
+async def get_library(sp, refresh: bool = False):
+    """Return the cached (TrackStore, FeatureIndex) of the user's library, rebuilding it when stale."""
+    async with _library_lock:
+        if refresh or _library["store"] is None or time.monotonic() - _library["loaded_at"] > LIBRARY_TTL:
+            store = await load_library(sp)
+            _library.update(loaded_at=time.monotonic(), store=store, index=FeatureIndex(store))
+        return _library["store"], _library["index"]
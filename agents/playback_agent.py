@@ -1,7 +1,9 @@
+import asyncio
 from typing import Optional
 import spotipy
 from mcp.server.fastmcp import FastMCP
 from .utils import get_spotify_client
+from .spotify_client import TRACK_MARKET
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-playback")
@@ -11,7 +13,7 @@ async def get_current_track() -> str:
     """Get information about the currently playing track on Spotify."""
     try:
         sp = get_spotify_client()
-        current_track = sp.current_playback()
+        current_track = await asyncio.to_thread(sp.current_playback, market=TRACK_MARKET)
         
         if not current_track or not current_track.get('item'):
             return "No track is currently playing."
@@ -43,7 +45,7 @@ async def play_track(query: str) -> str:
     sp = get_spotify_client()
     
     # Search for the track
-    results = sp.search(q=query, type='track', limit=1)
+    results = await asyncio.to_thread(sp.search, q=query, type='track', limit=1, market=TRACK_MARKET)
     
     if not results['tracks']['items']:
         return f"No tracks found for query: {query}"
@@ -53,7 +55,7 @@ async def play_track(query: str) -> str:
     
     # Start playback
     try:
-        sp.start_playback(uris=[track_uri])
+        await asyncio.to_thread(sp.start_playback, uris=[track_uri])
         return f"Now playing: {track['name']} by {track['artists'][0]['name']}"
     except spotipy.exceptions.SpotifyException as e:
         if e.http_status == 404:
@@ -71,16 +73,16 @@ async def control_playback(action: str) -> str:
     
     try:
         if action.lower() == "play":
-            sp.start_playback()
+            await asyncio.to_thread(sp.start_playback)
             return "Playback started"
         elif action.lower() == "pause":
-            sp.pause_playback()
+            await asyncio.to_thread(sp.pause_playback)
             return "Playback paused"
         elif action.lower() in ["next", "skip"]:
-            sp.next_track()
+            await asyncio.to_thread(sp.next_track)
             return "Skipped to next track"
         elif action.lower() in ["previous", "prev"]:
-            sp.previous_track()
+            await asyncio.to_thread(sp.previous_track)
             return "Returned to previous track"
         else:
             return f"Unknown action: {action}. Supported actions are: play, pause, next, previous"
@@ -1,9 +1,16 @@
+import asyncio
 import json
+import math
 import openai
 from typing import Optional
 import os
 from mcp.server.fastmcp import FastMCP
 from .utils import get_spotify_client
+from .spotify_client import PLAYLIST_ANALYSIS_FIELDS, TRACK_MARKET
+from .playlist_writer import PlaylistWriter, extract_playlist_id, fetch_playlist, fetch_playlist_items, fetch_user_playlists, fetch_audio_features
+from .resilience import get_breaker
+from .artist_cache import enrich_tracks
+from .similarity import FEATURE_KEYS, feature_centroids, feature_vector, cosine_similarity_matrix, jaccard_matrix
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-playlist")
@@ -18,45 +25,33 @@ async def analyze_playlist(playlist_url: str) -> str:
     sp = get_spotify_client()
     
     # Extract playlist ID from URL or URI
-    if "spotify.com/playlist/" in playlist_url:
-        playlist_id = playlist_url.split("spotify.com/playlist/")[1].split("?")[0]
-    elif "spotify:playlist:" in playlist_url:
-        playlist_id = playlist_url.split("spotify:playlist:")[1]
-    else:
-        playlist_id = playlist_url
+    playlist_id = extract_playlist_id(playlist_url)
     
     try:
-        # Get playlist details
-        playlist = sp.playlist(playlist_id)
+        # Get playlist details and every track, projected down to the fields used below
+        playlist, items = await fetch_playlist(sp, playlist_id, fields=PLAYLIST_ANALYSIS_FIELDS)
         playlist_name = playlist['name']
         playlist_owner = playlist['owner']['display_name']
         track_count = playlist['tracks']['total']
+        tracks = [item['track'] for item in items if item['track'] and item['track']['id']]
         
-        # Get tracks from the playlist (limited to first 100)
-        tracks = []
-        results = playlist['tracks']
-        tracks.extend(results['items'])
-        while results['next'] and len(tracks) < 100:
-            results = sp.next(results)
-            tracks.extend(results['items'])
-        
-        # Extract track IDs
-        track_ids = [track['track']['id'] for track in tracks if track['track'] and track['track']['id']]
-        
-        # Get audio features for all tracks
-        audio_features = []
-        for i in range(0, len(track_ids), 50):  # Process in batches of 50
-            batch = track_ids[i:i+50]
-            audio_features.extend(sp.audio_features(batch))
+        # Audio features and the genres and popularity of every credited artist, for the same tracks
+        features, enrichment = await asyncio.gather(
+            fetch_audio_features(sp, list({track['id'] for track in tracks})),
+            enrich_tracks(sp, tracks)
+        )
+        audio_features = [features[track['id']] for track in tracks if track['id'] in features]
+        if not audio_features:
+            return f"No audio features available for the tracks in playlist \"{playlist_name}\"."
         
         # Calculate averages
         avg_features = {
-            "danceability": sum(f['danceability'] for f in audio_features if f) / len(audio_features),
-            "energy": sum(f['energy'] for f in audio_features if f) / len(audio_features),
-            "valence": sum(f['valence'] for f in audio_features if f) / len(audio_features),
-            "tempo": sum(f['tempo'] for f in audio_features if f) / len(audio_features),
-            "acousticness": sum(f['acousticness'] for f in audio_features if f) / len(audio_features),
-            "instrumentalness": sum(f['instrumentalness'] for f in audio_features if f) / len(audio_features)
+            "danceability": sum(f['danceability'] for f in audio_features) / len(audio_features),
+            "energy": sum(f['energy'] for f in audio_features) / len(audio_features),
+            "valence": sum(f['valence'] for f in audio_features) / len(audio_features),
+            "tempo": sum(f['tempo'] for f in audio_features) / len(audio_features),
+            "acousticness": sum(f['acousticness'] for f in audio_features) / len(audio_features),
+            "instrumentalness": sum(f['instrumentalness'] for f in audio_features) / len(audio_features)
         }
         
         # Determine overall mood
@@ -79,21 +74,16 @@ async def analyze_playlist(playlist_url: str) -> str:
             else:
                 mood = "balanced and moderate"
         
-        # Get most common artists
-        artist_count = {}
-        for track in tracks:
-            if track['track'] and track['track']['artists']:
-                artist_name = track['track']['artists'][0]['name']
-                artist_count[artist_name] = artist_count.get(artist_name, 0) + 1
-        
-        top_artists = sorted(artist_count.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_artists = enrichment['artists'].most_common(5)
+        top_genres = enrichment['genres'].most_common(5)
+        multi_artist = sum(count for credits, count in enrichment['credits'].items() if credits > 1)
         
         # Format the response
         response = f"""
 Playlist Analysis: "{playlist_name}" by {playlist_owner}
 Total Tracks: {track_count}
 
-Musical Characteristics:
+Musical Characteristics ({len(audio_features)} of {len(tracks)} tracks with audio features):
 - Danceability: {avg_features['danceability']:.2f}/1.0
 - Energy: {avg_features['energy']:.2f}/1.0
 - Positivity: {avg_features['valence']:.2f}/1.0
@@ -108,6 +98,18 @@ Top Artists:
         for artist, count in top_artists:
             response += f"- {artist}: {count} tracks\n"
         
+        response += "\nTop Genres:\n"
+        if top_genres:
+            for genre, count in top_genres:
+                response += f"- {genre}: {count} tracks ({count / len(tracks):.0%})\n"
+        else:
+            response += "- No genres listed\n"
+        
+        if enrichment['popularity']:
+            low, median, high = enrichment['popularity']
+            response += f"\nArtist Popularity: {median:.0f}/100 median (range {low}-{high})\n"
+        response += f"Multi-artist Tracks: {multi_artist} of {len(tracks)}\n"
+        
         return response
     
     except Exception as e:
@@ -132,7 +134,10 @@ async def create_ai_playlist(prompt: str, name: Optional[str] = None) -> str:
     
     try:
         # Generate playlist concept from prompt
-        concept_response = openai.chat.completions.create(
+        openai_breaker = get_breaker("OpenAI")
+        concept_response = await asyncio.to_thread(
+            openai_breaker.call,
+            openai.chat.completions.create,
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a music expert helping to create a Spotify playlist."},
@@ -148,7 +153,9 @@ async def create_ai_playlist(prompt: str, name: Optional[str] = None) -> str:
         
         # Generate playlist name if not provided
         if not name:
-            name_response = openai.chat.completions.create(
+            name_response = await asyncio.to_thread(
+                openai_breaker.call,
+                openai.chat.completions.create,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a creative assistant helping to name a playlist."},
@@ -158,8 +165,9 @@ async def create_ai_playlist(prompt: str, name: Optional[str] = None) -> str:
             name = name_response.choices[0].message.content.strip().replace('"', '')
         
         # Create the playlist
-        user_id = sp.me()['id']
-        playlist = sp.user_playlist_create(
+        user_id = (await asyncio.to_thread(sp.me))['id']
+        playlist = await asyncio.to_thread(
+            sp.user_playlist_create,
             user=user_id,
             name=name,
             public=False,
@@ -172,16 +180,16 @@ async def create_ai_playlist(prompt: str, name: Optional[str] = None) -> str:
         
         for track_info in playlist_concept['tracks']:
             query = f"track:{track_info['name']} artist:{track_info['artist']}"
-            results = sp.search(q=query, type='track', limit=1)
+            results = await asyncio.to_thread(sp.search, q=query, type='track', limit=1, market=TRACK_MARKET)
             
             if results['tracks']['items']:
                 track_uris.append(results['tracks']['items'][0]['uri'])
             else:
                 not_found.append(f"{track_info['name']} by {track_info['artist']}")
         
-        # Add tracks to playlist
-        if track_uris:
-            sp.playlist_add_items(playlist['id'], track_uris)
+        # Add tracks to playlist (the playlist is new, so only dedupe the suggestions)
+        writer = PlaylistWriter(sp, playlist['id'], playlist.get('snapshot_id'))
+        added = await writer.add(track_uris, existing=[])
         
         # Format response
         response = f"""
@@ -189,7 +197,7 @@ Created playlist: "{name}"
 Description: {playlist_concept['description']}
 Link: {playlist['external_urls']['spotify']}
 
-Added {len(track_uris)} tracks to the playlist.
+Added {added} tracks to the playlist.
 """
         
         if not_found:
@@ -200,4 +208,209 @@ Added {len(track_uris)} tracks to the playlist.
         return response
     
     except Exception as e:
-        return f"Error creating AI playlist: {str(e)}" 
\ No newline at end of file
+        return f"Error creating AI playlist: {str(e)}" 
+
+# Audio features that playlists can be reordered by
+SORTABLE_FEATURES = ["tempo", "energy", "danceability", "valence", "acousticness", "energy_arc"]
+
+@mcp.tool()
+async def reorder_playlist(playlist_url: str, sort_by: str = "tempo", descending: bool = False) -> str:
+    """Reorder an existing playlist by an audio feature.
+    
+    The new order is computed locally and only the minimal set of moves is
+    written back (or a chunked rewrite, if that takes fewer requests).
+    
+    Args:
+        playlist_url: Spotify playlist URL or URI
+        sort_by: Feature to sort by (tempo, energy, danceability, valence, acousticness)
+                 or "energy_arc" to build up to the most energetic tracks and wind back down
+        descending: Sort from highest to lowest (ignored for energy_arc)
+    """
+    if sort_by not in SORTABLE_FEATURES:
+        return f"Invalid sort_by. Please use one of: {', '.join(SORTABLE_FEATURES)}."
+    
+    sp = get_spotify_client()
+    playlist_id = extract_playlist_id(playlist_url)
+    
+    try:
+        items, snapshot_id = await fetch_playlist_items(sp, playlist_id, fresh=True)
+        uris = [item['track']['uri'] if item['track'] else None for item in items]
+        track_ids = list({item['track']['id'] for item in items if item['track'] and item['track']['id']})
+        features = await fetch_audio_features(sp, track_ids)
+        
+        # Tracks without audio features (local files, episodes) keep their relative order at the end
+        with_features = [i for i, item in enumerate(items) if item['track'] and item['track']['id'] in features]
+        has_features = set(with_features)
+        without_features = [i for i in range(len(items)) if i not in has_features]
+        
+        if sort_by == "energy_arc":
+            ranked = sorted(with_features, key=lambda i: features[items[i]['track']['id']]['energy'])
+            # Alternate tracks between the rising and the falling side of the arc
+            ordered = ranked[0::2] + ranked[1::2][::-1]
+        else:
+            ordered = sorted(with_features, key=lambda i: features[items[i]['track']['id']][sort_by], reverse=descending)
+        order = ordered + without_features
+        
+        if order == list(range(len(items))):
+            return f"Playlist is already ordered by {sort_by}. No changes made."
+        
+        writer = PlaylistWriter(sp, playlist_id, snapshot_id)
+        strategy = await writer.reorder(uris, order)
+        
+        method = "moved tracks in place" if strategy == "move" else "rewrote the playlist"
+        return f"Reordered {len(items)} tracks by {sort_by} ({method}, {writer.requests} write requests)."
+    
+    except Exception as e:
+        return f"Error reordering playlist: {str(e)}"
+
+@mcp.tool()
+async def filter_playlist(playlist_url: str, min_tempo: Optional[float] = None, max_tempo: Optional[float] = None,
+                          min_energy: Optional[float] = None, max_energy: Optional[float] = None) -> str:
+    """Remove tracks from a playlist whose tempo or energy falls outside the given range.
+    
+    Args:
+        playlist_url: Spotify playlist URL or URI
+        min_tempo: Minimum tempo in BPM (optional)
+        max_tempo: Maximum tempo in BPM (optional)
+        min_energy: Minimum energy from 0.0 to 1.0 (optional)
+        max_energy: Maximum energy from 0.0 to 1.0 (optional)
+    """
+    if min_tempo is None and max_tempo is None and min_energy is None and max_energy is None:
+        return "Please provide at least one of min_tempo, max_tempo, min_energy or max_energy."
+    
+    sp = get_spotify_client()
+    playlist_id = extract_playlist_id(playlist_url)
+    
+    def in_range(value, low, high):
+        return (low is None or value >= low) and (high is None or value <= high)
+    
+    try:
+        items, snapshot_id = await fetch_playlist_items(sp, playlist_id, fresh=True)
+        track_ids = list({item['track']['id'] for item in items if item['track'] and item['track']['id']})
+        features = await fetch_audio_features(sp, track_ids)
+        
+        # Tracks without audio features are kept
+        to_remove = []
+        for item in items:
+            track = item['track']
+            if not track or track['id'] not in features:
+                continue
+            f = features[track['id']]
+            if not (in_range(f['tempo'], min_tempo, max_tempo) and in_range(f['energy'], min_energy, max_energy)):
+                to_remove.append(track['uri'])
+        
+        if not to_remove:
+            return "All tracks are within the given range. No changes made."
+        
+        writer = PlaylistWriter(sp, playlist_id, snapshot_id)
+        await writer.remove(to_remove)
+        
+        return f"Removed {len(to_remove)} of {len(items)} tracks ({writer.requests} write requests)."
+    
+    except Exception as e:
+        return f"Error filtering playlist: {str(e)}"
+
+@mcp.tool()
+async def compare_playlists(playlist_urls: Optional[str] = None, duplicate_threshold: float = 0.5) -> str:
+    """Compare many playlists at once and report near-duplicates and outliers.
+    
+    Args:
+        playlist_urls: Comma-separated playlist URLs or URIs (optional, defaults to all of your playlists)
+        duplicate_threshold: Track overlap (Jaccard, 0.0 to 1.0) above which two playlists count as near-duplicates
+    """
+    sp = get_spotify_client()
+    
+    try:
+        if playlist_urls:
+            playlist_ids = list(dict.fromkeys(extract_playlist_id(url.strip()) for url in playlist_urls.split(",") if url.strip()))
+            metas = await asyncio.gather(*[
+                asyncio.to_thread(sp.playlist, playlist_id, fields="name")
+                for playlist_id in playlist_ids
+            ])
+            playlists = [(playlist_id, meta['name']) for playlist_id, meta in zip(playlist_ids, metas)]
+        else:
+            playlists = await fetch_user_playlists(sp)
+        
+        if len(playlists) < 2:
+            return "Please provide at least two playlists to compare."
+        
+        # Fetch all playlists concurrently
+        contents = await asyncio.gather(*[fetch_playlist_items(sp, playlist_id) for playlist_id, _ in playlists])
+        
+        track_sets = []
+        artist_sets = []
+        for items, _ in contents:
+            tracks = [item['track'] for item in items if item['track'] and item['track']['id']]
+            track_sets.append({t['id'] for t in tracks})
+            artist_sets.append({t['artists'][0]['name'] for t in tracks if t.get('artists')})
+        
+        # Audio features are fetched once per unique track across the whole collection
+        all_tracks = list(set().union(*track_sets))
+        features = await fetch_audio_features(sp, all_tracks)
+        
+        centroids = feature_centroids(track_sets, features)
+        if features:
+            vectors = [feature_vector(f) for f in features.values()]
+            center = [sum(col) / len(vectors) for col in zip(*vectors)]
+        else:
+            center = None
+        
+        feature_sim = cosine_similarity_matrix(centroids, center)
+        track_sim = jaccard_matrix(track_sets)
+        artist_sim = jaccard_matrix(artist_sets)
+        
+        n = len(playlists)
+        names = [name for _, name in playlists]
+        
+        # Combined score: sound similarity (mapped to 0-1) and artist overlap weigh equally
+        combined = [[(feature_sim[i][j] + 1) / 4 + artist_sim[i][j] / 2 for j in range(n)] for i in range(n)]
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        
+        duplicates = sorted(
+            [(i, j) for i, j in pairs if track_sim[i][j] >= duplicate_threshold],
+            key=lambda p: track_sim[p[0]][p[1]], reverse=True
+        )
+        most_similar = sorted(pairs, key=lambda p: combined[p[0]][p[1]], reverse=True)[:5]
+        
+        # Outliers: playlists whose sound sits unusually far from the collection average
+        distances = [math.dist(c, center) if c is not None else None for c in centroids]
+        known = [d for d in distances if d is not None]
+        avg = sum(known) / len(known) if known else 0.0
+        std = (sum((d - avg) ** 2 for d in known) / len(known)) ** 0.5 if known else 0.0
+        outliers = sorted(
+            [i for i, d in enumerate(distances) if d is None or (std and (d - avg) / std > 2)],
+            key=lambda i: distances[i] if distances[i] is not None else float("inf"), reverse=True
+        )[:5]
+        
+        # Format the response
+        response = f"Compared {n} playlists ({len(all_tracks)} unique tracks, {len(features)} with audio features).\n"
+        
+        response += f"\nNear-duplicates (track overlap >= {duplicate_threshold:.0%}):\n"
+        if duplicates:
+            for i, j in duplicates:
+                response += f"- \"{names[i]}\" and \"{names[j]}\": {track_sim[i][j]:.0%} track overlap\n"
+        else:
+            response += "- None\n"
+        
+        response += "\nMost similar pairs:\n"
+        for i, j in most_similar:
+            response += (f"- \"{names[i]}\" and \"{names[j]}\": sound similarity {feature_sim[i][j]:.2f}, "
+                         f"artist overlap {artist_sim[i][j]:.0%}, track overlap {track_sim[i][j]:.0%}\n")
+        
+        response += "\nOutliers:\n"
+        if outliers:
+            for i in outliers:
+                if centroids[i] is None:
+                    response += f"- \"{names[i]}\": no audio features available\n"
+                    continue
+                # Describe the feature that deviates most from the collection average
+                deviations = [(abs(a - b), k, a > b) for a, b, k in zip(centroids[i], center, FEATURE_KEYS)]
+                _, feature, higher = max(deviations)
+                response += f"- \"{names[i]}\": {'higher' if higher else 'lower'} {feature} than the rest of the collection\n"
+        else:
+            response += "- None\n"
+        
+        return response
+    
+    except Exception as e:
+        return f"Error comparing playlists: {str(e)}"
@@ -0,0 +1,315 @@
+import asyncio
+import math
+import sys
+from bisect import bisect_left
+from typing import Optional
+from .spotify_client import PLAYLIST_ITEM_FIELDS
+from .resilience import fresh_reads
+
+# Spotify accepts at most 100 items per playlist add/remove/replace request
+PLAYLIST_WRITE_CHUNK = 100
+# Spotify returns at most 100 audio feature objects per request
+AUDIO_FEATURES_CHUNK = 100
+# Attempts at putting a playlist's original contents back after a failed rewrite
+RESTORE_ATTEMPTS = 3
+
+class PlaylistWriteError(Exception):
+    """Raised when a multi-request playlist rewrite fails part way through."""
+
+def extract_playlist_id(playlist_url: str) -> str:
+    """Extract a playlist ID from a Spotify playlist URL, URI or bare ID."""
+    if "spotify.com/playlist/" in playlist_url:
+        return playlist_url.split("spotify.com/playlist/")[1].split("?")[0]
+    elif "spotify:playlist:" in playlist_url:
+        return playlist_url.split("spotify:playlist:")[1]
+    return playlist_url
+
+def chunked(items, size=PLAYLIST_WRITE_CHUNK):
+    """Split a list into consecutive chunks of at most `size` items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+async def fetch_playlist(sp, playlist_id: str, fields: str = "snapshot_id", fresh: bool = False):
+    """Fetch a playlist's `fields` along with every one of its items.
+
+    The playlist object already embeds the first page of items, which tells us
+    the total; the remaining pages are then fetched concurrently by offset
+    instead of following `next` links one at a time. Every page asks for tracks
+    only, like the embedded one, so podcast episodes never come back as episode
+    objects.
+
+    With `fresh`, the reads never fall back to cached responses; use it when
+    the contents feed a write.
+
+    Returns (playlist, items). The playlist object may be a shared cached
+    response, so the items are collected into a new list rather than into it.
+    """
+    if fresh:
+        with fresh_reads():
+            return await fetch_playlist(sp, playlist_id, fields)
+
+    playlist = await asyncio.to_thread(sp.playlist, playlist_id, fields=f"{fields},tracks({PLAYLIST_ITEM_FIELDS})")
+    first = playlist['tracks']
+    pages = await asyncio.gather(*[
+        asyncio.to_thread(
+            sp.playlist_items, playlist_id, fields=PLAYLIST_ITEM_FIELDS, limit=100, offset=offset,
+            additional_types=("track",)
+        )
+        for offset in range(len(first['items']), first['total'], 100)
+    ])
+    items = list(first['items'])
+    for page in pages:
+        items.extend(page['items'])
+    return playlist, items
+
+async def fetch_playlist_items(sp, playlist_id: str, fresh: bool = False):
+    """Fetch every item of a playlist along with its current snapshot_id (see fetch_playlist for `fresh`)."""
+    playlist, items = await fetch_playlist(sp, playlist_id, fresh=fresh)
+    return items, playlist['snapshot_id']
+
+async def fetch_user_playlists(sp):
+    """Fetch all of the current user's playlists, paging concurrently after the first page."""
+    first = await asyncio.to_thread(sp.current_user_playlists, limit=50, offset=0)
+    pages = await asyncio.gather(*[
+        asyncio.to_thread(sp.current_user_playlists, limit=50, offset=offset)
+        for offset in range(50, first['total'], 50)
+    ])
+    playlists = list(first['items'])
+    for page in pages:
+        playlists.extend(page['items'])
+    return [(p['id'], p['name']) for p in playlists if p]
+
+async def fetch_audio_features(sp, track_ids):
+    """Fetch audio features for many tracks in concurrent 100-ID batches.
+
+    Returns a dict mapping track ID to its feature dict; tracks without
+    features are left out.
+    """
+    batches = await asyncio.gather(*[
+        asyncio.to_thread(sp.audio_features, batch)
+        for batch in chunked(track_ids, AUDIO_FEATURES_CHUNK)
+    ])
+    return {f['id']: f for batch in batches for f in batch if f}
+
+def longest_increasing_subsequence(values):
+    """Return the longest strictly increasing subsequence of `values` (patience sorting, O(n log n))."""
+    tails, tail_idx, prev = [], [], [-1] * len(values)
+    for k, value in enumerate(values):
+        lo = bisect_left(tails, value)
+        if lo == len(tails):
+            tails.append(value)
+            tail_idx.append(k)
+        else:
+            tails[lo] = value
+            tail_idx[lo] = k
+        prev[k] = tail_idx[lo - 1] if lo > 0 else -1
+
+    subsequence = []
+    k = tail_idx[-1] if tail_idx else -1
+    while k != -1:
+        subsequence.append(values[k])
+        k = prev[k]
+    return subsequence[::-1]
+
+def count_moves(order) -> int:
+    """Return the number of single-item moves plan_moves(order) produces, without planning them."""
+    return len(order) - len(longest_increasing_subsequence(order))
+
+def plan_moves(order):
+    """Plan the minimal list of single-item moves that applies a reordering.
+
+    Args:
+        order: order[k] is the current position of the item that should end up at position k
+
+    Returns a list of (range_start, insert_before) pairs in Spotify's reorder
+    semantics, to be applied one after the other. Items on a longest increasing
+    subsequence of `order` already sit in the right relative order and stay put,
+    so exactly len(order) - LIS moves are produced.
+
+    Every other item is moved right after its target predecessor. Positions are
+    tracked in O(log n) with a Fenwick tree over slots: each item starts in the
+    slot of its current position, and a moved item goes to a slot right after
+    the last stable item before it in the target order (or the start), after
+    any items moved there earlier.
+    """
+    n = len(order)
+    stable = set(longest_increasing_subsequence(order))
+
+    # Slot keys: (current position, 0) for items that haven't moved, and
+    # (position of the anchoring stable item, j) for the j-th item moved after it
+    keys = [(i, 0) for i in range(n)]
+    targets = {}
+    anchor, j = -1, 0
+    for item in order:
+        if item in stable:
+            anchor, j = item, 0
+        else:
+            j += 1
+            targets[item] = (anchor, j)
+    keys.extend(targets.values())
+    slot_of = {key: slot for slot, key in enumerate(sorted(keys), 1)}
+
+    tree = [0] * (len(keys) + 1)
+
+    def add(slot, delta):
+        while slot < len(tree):
+            tree[slot] += delta
+            slot += slot & -slot
+
+    def before(slot):
+        """Number of items in slots before `slot`."""
+        total, slot = 0, slot - 1
+        while slot > 0:
+            total += tree[slot]
+            slot -= slot & -slot
+        return total
+
+    slots = [slot_of[(i, 0)] for i in range(n)]
+    for slot in slots:
+        add(slot, 1)
+
+    moves = []
+    for k, item in enumerate(order):
+        if item in stable:
+            continue
+        start = before(slots[item])
+        after = before(slots[order[k - 1]]) + 1 if k > 0 else 0
+        if start != after:
+            moves.append((start, after))
+        add(slots[item], -1)
+        slots[item] = slot_of[targets[item]]
+        add(slots[item], 1)
+    return moves
+
+class PlaylistWriter:
+    """Writes to a playlist in 100-item chunks while tracking its snapshot_id."""
+
+    def __init__(self, sp, playlist_id: str, snapshot_id: Optional[str] = None):
+        self.sp = sp
+        self.playlist_id = playlist_id
+        self.snapshot_id = snapshot_id
+        # Number of write requests sent so far
+        self.requests = 0
+
+    async def add(self, uris, existing=None, dedupe: bool = True) -> int:
+        """Append tracks to the playlist, skipping URIs it already contains.
+
+        Adds run sequentially so the playlist keeps the requested order.
+
+        Args:
+            uris: Track URIs to add
+            existing: URIs already in the playlist (fetched if not provided and dedupe is on)
+            dedupe: Whether to skip duplicates within `uris` and against the playlist
+        """
+        if dedupe:
+            if existing is None:
+                items, self.snapshot_id = await fetch_playlist_items(self.sp, self.playlist_id, fresh=True)
+                existing = [item['track']['uri'] for item in items if item['track']]
+            seen = set(existing)
+            uris = [uri for uri in uris if not (uri in seen or seen.add(uri))]
+
+        for batch in chunked(uris):
+            result = await asyncio.to_thread(self.sp.playlist_add_items, self.playlist_id, batch)
+            self.snapshot_id = result['snapshot_id']
+            self.requests += 1
+        return len(uris)
+
+    async def remove(self, uris) -> int:
+        """Remove every occurrence of the given track URIs from the playlist.
+
+        Removes run sequentially, each against the snapshot the previous one
+        produced, so snapshot_id always tracks the latest version.
+        """
+        uris = list(dict.fromkeys(uris))
+        for batch in chunked(uris):
+            result = await asyncio.to_thread(
+                self.sp.playlist_remove_all_occurrences_of_items,
+                self.playlist_id, batch, snapshot_id=self.snapshot_id
+            )
+            self.snapshot_id = result['snapshot_id']
+            self.requests += 1
+        return len(uris)
+
+    async def _rewrite(self, uris):
+        """Overwrite the playlist with `uris`: a replace of the first chunk, then appends.
+
+        Returns (tracks written, error); the error is None if every request went through.
+        """
+        written = 0
+        for i, batch in enumerate(chunked(list(uris)) or [[]]):
+            write = self.sp.playlist_replace_items if i == 0 else self.sp.playlist_add_items
+            try:
+                result = await asyncio.to_thread(write, self.playlist_id, batch)
+            except Exception as e:
+                return written, e
+            self.snapshot_id = result['snapshot_id']
+            self.requests += 1
+            written += len(batch)
+        return written, None
+
+    async def replace(self, uris, previous=None) -> int:
+        """Overwrite the playlist contents with `uris` (in order).
+
+        A rewrite takes several requests and isn't atomic: once the first one
+        has gone through, the playlist is cut down to 100 tracks until the rest
+        are appended. If a later request fails and `previous` (the current
+        contents) is given, the original contents are written back before
+        PlaylistWriteError is raised. Should that fail too, the original URIs
+        are printed to stderr so they can be recovered.
+        """
+        uris = list(uris)
+        written, error = await self._rewrite(uris)
+        if error is None:
+            return len(uris)
+        if not written or previous is None:
+            raise error
+
+        for attempt in range(RESTORE_ATTEMPTS):
+            _, restore_error = await self._rewrite(previous)
+            if restore_error is None:
+                raise PlaylistWriteError(
+                    f"Rewriting the playlist failed after {written} of {len(uris)} tracks ({error}). "
+                    f"Its original contents were restored."
+                ) from error
+            await asyncio.sleep(attempt + 1)
+
+        print(f"Could not restore playlist {self.playlist_id}. Original track URIs:", file=sys.stderr)
+        print("\n".join(previous), file=sys.stderr)
+        raise PlaylistWriteError(
+            f"Rewriting the playlist failed after {written} of {len(uris)} tracks ({error}), "
+            f"and restoring its original {len(previous)} tracks failed too ({restore_error}). "
+            f"The original track URIs were written to the server log."
+        ) from error
+
+    async def reorder(self, uris, order) -> str:
+        """Reorder the playlist with the fewest write requests.
+
+        Applies the minimal set of single-item moves, guarded by the snapshot_id,
+        unless rewriting the whole playlist in 100-item chunks would take fewer
+        requests. Playlists with local files or unavailable tracks (items
+        without a spotify:track URI) can't be rewritten and are always moved.
+
+        Args:
+            uris: Current playlist contents, in order (None for unavailable items)
+            order: order[k] is the current position of the item that should end up at position k
+
+        Returns "move" or "replace" depending on the strategy used.
+        """
+        # The move count comes from the LIS alone; the moves are only planned when they win
+        rewritable = all(uri and uri.startswith("spotify:track:") for uri in uris)
+        if rewritable and count_moves(order) > math.ceil(len(uris) / PLAYLIST_WRITE_CHUNK):
+            await self.replace([uris[i] for i in order], previous=uris)
+            return "replace"
+
+        moves = await asyncio.to_thread(plan_moves, order)
+
+        for range_start, insert_before in moves:
+            result = await asyncio.to_thread(
+                self.sp.playlist_reorder_items,
+                self.playlist_id,
+                range_start=range_start,
+                insert_before=insert_before,
+                snapshot_id=self.snapshot_id
+            )
+            self.snapshot_id = result['snapshot_id']
+            self.requests += 1
+        return "move"
@@ -0,0 +1,234 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Where collapsed stacks and stall reports are written (defaults to profiles/ in the project,
+# not the working directory, which MCP clients often set to somewhere unwritable)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles"))
+
+# Leaf frames of threads that are just waiting, as (file path suffix, function name);
+# their samples are dropped. Matching the file too keeps app functions named get or wait.
+IDLE_FRAMES = {
+    ("/selectors.py", "select"),
+    ("/threading.py", "wait"),
+    ("/threading.py", "_wait_for_tstate_lock"),
+    ("/queue.py", "get"),
+    ("/concurrent/futures/thread.py", "_worker"),
+    ("/socket.py", "accept"),
+    ("/socketserver.py", "serve_forever"),
+}
+
+# Path fragments used to attribute samples to a category
+NETWORK_FILES = ("ssl.py", "socket.py", "http/client.py", "urllib3", "requests/")
+JSON_FILES = ("json/decoder.py", "json/__init__.py", "orjson")
+
+_session = None
+_last_session = None
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def collapse(frame):
+    """Return the stack of `frame`, outermost first, as a list of (filename, frame name)."""
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code.co_filename, frame_name(frame)))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def is_idle(frame) -> bool:
+    """Tell whether a thread's leaf frame is stdlib code waiting for work."""
+    filename = frame.f_code.co_filename.replace("\\", "/")
+    return any(filename.endswith(suffix) and frame.f_code.co_name == name for suffix, name in IDLE_FRAMES)
+
+def categorize(stack) -> str:
+    """Attribute a sampled stack to network, JSON decoding or Python work."""
+    files = [filename.replace("\\", "/") for filename, _ in stack]
+    if any(fragment in f for f in files for fragment in NETWORK_FILES):
+        return "network"
+    if any(fragment in f for f in files for fragment in JSON_FILES) or stack[-1][1].startswith("SpotifyClient._fast_json_hook.<locals>.decode"):
+        return "JSON decoding"
+    return "Python"
+
+class ProfileSession:
+    """A sampling profiler capture with event-loop stall detection.
+
+    A background thread samples every thread's stack every `interval` seconds
+    and counts collapsed stacks, prefixed with the tool calls in progress. A
+    heartbeat scheduled on the event loop lets the same thread notice when the
+    loop hasn't run for more than `stall_threshold` seconds and capture what the
+    loop thread is doing.
+    """
+
+    def __init__(self, calls=None, seconds=None, interval=0.005, stall_threshold=0.1):
+        # 0 or None: no call limit
+        self.remaining_calls = calls or None
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.stalls = []
+        self.active_tools = Counter()
+        self.calls = 0
+        self.started_at = datetime.now()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopped = threading.Event()
+        self.finished = False
+        self.output = None
+        self.error = None
+        self.thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+
+    def start(self):
+        self.loop.call_soon(self._heartbeat)
+        self.thread.start()
+
+    def _heartbeat(self):
+        self.last_beat = time.monotonic()
+        if not self.stopped.is_set():
+            self.loop.call_later(self.interval, self._heartbeat)
+
+    def _sample(self):
+        stall = None
+        while not self.stopped.wait(self.interval):
+            now = time.monotonic()
+            if self.deadline and now >= self.deadline:
+                break
+
+            tools = ";".join(f"tool:{name}" for name in sorted(self.active_tools)) or "no tool"
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == threading.get_ident():
+                    continue
+                stack = collapse(frame)
+                if not stack or is_idle(frame):
+                    continue
+                self.stacks[";".join([tools, names.get(ident, str(ident))] + [name for _, name in stack])] += 1
+                self.categories[categorize(stack)] += 1
+
+            # Event-loop stall detection
+            blocked = now - self.last_beat
+            if blocked > self.stall_threshold:
+                if stall is None:
+                    frame = sys._current_frames().get(self.loop_thread)
+                    stall = {"tools": tools, "duration": blocked, "stack": [name for _, name in collapse(frame)] if frame else []}
+                    self.stalls.append(stall)
+                stall["duration"] = blocked
+            else:
+                stall = None
+        if not self.finished:
+            # The time limit ran out; finish on the loop thread like a call-limited capture
+            try:
+                self.loop.call_soon_threadsafe(self.finish)
+            except RuntimeError:
+                self.finish()
+
+    def finish(self):
+        """Stop sampling and write the capture to PROFILE_DIR. Safe to call more than once."""
+        global _session, _last_session
+        if self.finished:
+            return self.output
+        self.finished = True
+        self.stopped.set()
+        if self.thread.is_alive() and threading.current_thread() is not self.thread:
+            self.thread.join()
+        if _session is self:
+            _session = None
+        _last_session = self
+
+        try:
+            self.output = self.write()
+        except OSError as e:
+            # Never let a failed write replace the result of the profiled tool call
+            self.error = e
+            print(f"Could not write profile to {PROFILE_DIR}: {e}", file=sys.stderr)
+            return None
+        print(f"Profile written to {self.output}.folded", file=sys.stderr)
+        return self.output
+
+    def write(self) -> str:
+        """Write the collapsed stacks and stall report to PROFILE_DIR and return their common path prefix."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        # The counter suffix keeps captures started within the same second apart
+        stamp = f"profile-{self.started_at:%Y%m%d-%H%M%S}"
+        suffix = 0
+        while True:
+            base = os.path.join(PROFILE_DIR, f"{stamp}-{suffix}" if suffix else stamp)
+            try:
+                f = open(f"{base}.folded", "x")
+                break
+            except FileExistsError:
+                suffix += 1
+        with f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}-stalls.txt", "w") as f:
+            for stall in self.stalls:
+                f.write(f"Event loop blocked for {stall['duration'] * 1000:.0f} ms during {stall['tools']}:\n")
+                for name in stall["stack"]:
+                    f.write(f"    {name}\n")
+                f.write("\n")
+        return base
+
+    def summary(self) -> str:
+        total = sum(self.categories.values())
+        response = f"Tool calls profiled: {self.calls}\n"
+        response += f"Samples: {total}\n"
+        for category, count in self.categories.most_common():
+            response += f"- {category}: {count / total:.0%}\n"
+        blocked = sum(stall["duration"] for stall in self.stalls)
+        response += f"Event loop stalls over {self.stall_threshold * 1000:.0f} ms: {len(self.stalls)} ({blocked * 1000:.0f} ms blocked)\n"
+        if self.output:
+            response += f"\nCollapsed stacks: {self.output}.folded\nStall stacks: {self.output}-stalls.txt\n"
+        elif self.error:
+            response += f"\nCould not write the capture to {PROFILE_DIR}: {self.error}\n"
+        return response
+
+def start_session(calls=None, seconds=None, interval=0.005, stall_threshold=0.1):
+    """Start a capture for the next `calls` tool calls or `seconds` seconds, whichever ends first."""
+    global _session
+    if _session is not None:
+        raise RuntimeError("A profiling capture is already running.")
+    _session = ProfileSession(calls, seconds, interval, stall_threshold)
+    _session.start()
+    return _session
+
+def current_session():
+    return _session
+
+def last_session():
+    return _last_session
+
+def profiled(func):
+    """Decorate an async tool so profiling captures can attribute samples to it and count its calls.
+
+    When no capture is running this is a single global lookup.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        session = _session
+        if session is None:
+            return await func(*args, **kwargs)
+
+        session.active_tools[func.__name__] += 1
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            session.active_tools[func.__name__] -= 1
+            if not session.active_tools[func.__name__]:
+                del session.active_tools[func.__name__]
+            session.calls += 1
+            if session.remaining_calls is not None:
+                session.remaining_calls -= 1
+                if session.remaining_calls <= 0:
+                    session.finish()
+    return wrapper
@@ -0,0 +1,302 @@
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Circuit breaker settings, shared by every endpoint group
+BREAKER_WINDOW = 20            # Number of recent calls the failure rate is computed over
+BREAKER_MIN_CALLS = 5          # Calls needed in the window before the breaker can open
+BREAKER_FAILURE_RATE = 0.5     # Failure rate that opens the breaker
+BREAKER_RESET_TIMEOUT = 30.0   # Seconds an open breaker waits before letting a probe through
+
+# How long a read waits for the upstream before answering from cache (seconds)
+STALE_AFTER = 2.0
+# Per-request timeout and connection retries of Spotify calls. Status retries
+# (5xx, 429) are left to the circuit breakers and cached answers instead of
+# sleeping through backoff while a tool call waits.
+REQUEST_TIMEOUT = 5.0
+REQUEST_RETRIES = 1
+# Reads that can be in flight to the upstream at once; a read waits (up to
+# STALE_AFTER) for a free slot instead of queueing behind slow requests
+REFRESH_WORKERS = 32
+# Maximum number of cached GET responses
+RESPONSE_CACHE_SIZE = 256
+
+# Request hedging settings
+HEDGE_PERCENTILE = 0.95        # Latency percentile after which a second attempt is sent
+HEDGE_MIN_SAMPLES = 20         # Latencies needed before an endpoint group is hedged
+HEDGE_WINDOW = 256             # Number of recent latencies the percentile is computed over
+HEDGE_BUDGET_RATIO = 0.05      # Hedges allowed per request (so at most ~5% extra load)
+HEDGE_BUDGET_BURST = 10        # Hedges that can be spent at once after a quiet period
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, name):
+        super().__init__(f"{name} is currently unavailable, please try again shortly.")
+        self.name = name
+
+def is_upstream_failure(error) -> bool:
+    """Tell upstream failures (5xx, 429, timeouts, connection errors) from client errors (other 4xx)."""
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status >= 500 or status == 429
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with half-open probes.
+
+    Closed: calls go through and their outcomes are recorded in a rolling window.
+    Open: calls fail fast until BREAKER_RESET_TIMEOUT has passed.
+    Half-open: a single probe call is let through; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "closed"
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the upstream now."""
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= BREAKER_RESET_TIMEOUT:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record(self, ok: bool):
+        """Record the outcome of a call that allow() let through."""
+        with self.lock:
+            if self.state == "half_open":
+                if ok:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                else:
+                    self.state = "open"
+                    self.opened_at = time.monotonic()
+                return
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= BREAKER_MIN_CALLS and failures / len(self.outcomes) >= BREAKER_FAILURE_RATE:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def run(self, func, *args, **kwargs):
+        """Call `func` and record its outcome, without checking allow() first."""
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record(not is_upstream_failure(e))
+            raise
+        self.record(True)
+        return result
+
+    def call(self, func, *args, **kwargs):
+        """Call `func` through the breaker, raising CircuitOpenError if it's open."""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        return self.run(func, *args, **kwargs)
+
+BREAKERS = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the circuit breaker of an upstream endpoint group, creating it on first use."""
+    with _breakers_lock:
+        if name not in BREAKERS:
+            BREAKERS[name] = CircuitBreaker(name)
+        return BREAKERS[name]
+
+class LatencyTracker:
+    """Rolling window of request latencies for one endpoint group."""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=HEDGE_WINDOW)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def percentile(self, q: float):
+        """Return the q-th latency percentile, or None until enough samples have been seen."""
+        with self.lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class HedgeBudget:
+    """Token bucket that caps hedged attempts at a fraction of all requests."""
+
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+        self.lock = threading.Lock()
+
+    def earn(self):
+        """Credit the budget for one request."""
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        """Take one hedge from the budget, if there's one left."""
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+LATENCY_TRACKERS = {}
+HEDGE_BUDGET = HedgeBudget()
+_trackers_lock = threading.Lock()
+# Attempts run here so the caller can wait on whichever finishes first. Every
+# read slot can have a first attempt and a hedge in flight, so attempts don't queue.
+_hedge_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS * 2, thread_name_prefix="hedge")
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """Return the latency tracker of an endpoint group, creating it on first use."""
+    with _trackers_lock:
+        if name not in LATENCY_TRACKERS:
+            LATENCY_TRACKERS[name] = LatencyTracker()
+        return LATENCY_TRACKERS[name]
+
+def hedged(name: str, func, *args, **kwargs):
+    """Call an idempotent `func`, sending a second attempt if the first is slow.
+
+    If the first attempt hasn't finished after the endpoint group's
+    HEDGE_PERCENTILE latency and the global budget allows it, a second attempt
+    is started and whichever succeeds first wins. The other attempt is
+    cancelled if it hasn't started yet; an HTTP request already in flight can't
+    be interrupted, so its result is discarded. Every attempt's latency feeds
+    the tracker, so the hedge delay follows the endpoint's real distribution;
+    like those latencies, the delay counts from when the first attempt starts
+    running, not from when it was submitted.
+    """
+    tracker = get_latency_tracker(name)
+    HEDGE_BUDGET.earn()
+    delay = tracker.percentile(HEDGE_PERCENTILE)
+
+    def attempt(started=None):
+        if started is not None:
+            started.set()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracker.record(time.perf_counter() - start)
+
+    if delay is None:
+        return attempt()
+
+    started = threading.Event()
+    first = _hedge_pool.submit(attempt, started)
+    started.wait()
+    done, _ = wait([first], timeout=delay)
+    if done or not HEDGE_BUDGET.spend():
+        return first.result()
+
+    pending = {first, _hedge_pool.submit(attempt)}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((f for f in done if f.exception() is None), None)
+        if winner is not None or not pending:
+            for future in pending:
+                future.cancel()
+            return (winner or done.pop()).result()
+
+def api_path(url: str) -> str:
+    """Return the path of a Spotify API URL relative to /v1/, without the query string."""
+    return url.split("/v1/", 1)[-1].split("?")[0].strip("/")
+
+class ResponseCache:
+    """Thread-safe LRU cache of upstream responses with their fetch time."""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, fetched_at) for `key`, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, path: str):
+        """Drop the cached responses of an API path (e.g. "playlists/<id>") and everything below it."""
+        with self.lock:
+            for key in [key for key in self.entries if api_path(key[0]) == path or api_path(key[0]).startswith(path + "/")]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+RESPONSE_CACHE = ResponseCache()
+
+# Set while reading data that a write will be based on, see fresh_reads
+_fresh_reads = contextvars.ContextVar("fresh_reads", default=False)
+
+@contextlib.contextmanager
+def fresh_reads():
+    """Within this block, reads never fall back to cached responses.
+
+    Use it wherever a read feeds a write (e.g. the contents and snapshot_id a
+    playlist reorder is planned from): those reads wait for the upstream, or
+    fail, instead of quietly returning older data. The flag is a context
+    variable, so it carries over into asyncio.to_thread calls and tasks
+    started inside the block.
+    """
+    token = _fresh_reads.set(True)
+    try:
+        yield
+    finally:
+        _fresh_reads.reset(token)
+
+def reads_must_be_fresh() -> bool:
+    return _fresh_reads.get()
+
+# Ages (in seconds) of the stale responses served during the current tool call
+_stale_reads = contextvars.ContextVar("stale_reads", default=None)
+
+def record_stale_read(fetched_at: float):
+    """Note that a stale cached response was served for the current tool call."""
+    reads = _stale_reads.get()
+    if reads is not None:
+        reads.append(time.monotonic() - fetched_at)
+
+def mark_stale(func):
+    """Decorate an async tool so its answer says when it was built from stale cached data."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _stale_reads.set([])
+        try:
+            result = await func(*args, **kwargs)
+            reads = _stale_reads.get()
+        finally:
+            _stale_reads.reset(token)
+        if reads and isinstance(result, str):
+            oldest = max(reads)
+            age = f"{oldest / 60:.0f} minutes" if oldest >= 120 else f"{oldest:.0f} seconds"
+            result += (f"\n\n[STALE] Spotify is slow or unavailable right now, so this answer uses cached data "
+                       f"up to {age} old. It will be refreshed as soon as Spotify responds again.")
+        return result
+    return wrapper
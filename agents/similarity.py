@@ -0,0 +1,93 @@
+import math
+from collections import defaultdict
+
+# Audio features used to describe the overall sound of a playlist
+FEATURE_KEYS = ["danceability", "energy", "valence", "acousticness", "instrumentalness", "tempo"]
+# Divisors that bring features onto a comparable 0-1 scale
+FEATURE_SCALE = {"tempo": 200.0}
+
+def feature_vector(features):
+    """Turn a Spotify audio features dict into a scaled feature vector."""
+    return [features[k] / FEATURE_SCALE.get(k, 1.0) for k in FEATURE_KEYS]
+
+def feature_centroids(track_sets, features):
+    """Compute the mean feature vector of each playlist.
+
+    Args:
+        track_sets: One iterable of track IDs per playlist
+        features: Dict mapping track ID to audio features
+
+    Returns one centroid per playlist, or None for playlists without any audio features.
+    """
+    vectors = {track_id: feature_vector(f) for track_id, f in features.items()}
+    centroids = []
+    for tracks in track_sets:
+        rows = [vectors[t] for t in tracks if t in vectors]
+        if rows:
+            centroids.append([sum(col) / len(rows) for col in zip(*rows)])
+        else:
+            centroids.append(None)
+    return centroids
+
+def cosine_similarity_matrix(vectors, center=None):
+    """Compute the full pairwise cosine similarity matrix of a list of vectors.
+
+    Raw audio feature centroids are all positive and point in roughly the same
+    direction, so vectors are first shifted by `center` (typically the mean over
+    the whole collection) and compared by how they deviate from it. Each vector
+    is normalised once, leaving a single dot product per pair. Missing vectors
+    (None) get a similarity of 0 to everything else.
+    """
+    units = []
+    for v in vectors:
+        if v is None:
+            units.append(None)
+            continue
+        if center is not None:
+            v = [a - b for a, b in zip(v, center)]
+        norm = math.sqrt(sum(a * a for a in v))
+        units.append([a / norm for a in v] if norm else None)
+
+    n = len(units)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        if vectors[i] is not None:
+            matrix[i][i] = 1.0
+        if units[i] is None:
+            continue
+        ui = units[i]
+        for j in range(i + 1, n):
+            if units[j] is not None:
+                matrix[i][j] = matrix[j][i] = sum(map(float.__mul__, ui, units[j]))
+    return matrix
+
+def jaccard_matrix(sets):
+    """Compute the full pairwise Jaccard similarity matrix of a list of sets.
+
+    Intersections are counted through an inverted index (item -> sets containing
+    it), so the work grows with the actual overlap rather than with the number of
+    pairs times the set sizes.
+    """
+    n = len(sets)
+    index = defaultdict(list)
+    for i, s in enumerate(sets):
+        for item in s:
+            index[item].append(i)
+
+    intersections = [[0] * n for _ in range(n)]
+    for members in index.values():
+        for a in range(len(members)):
+            row = intersections[members[a]]
+            for b in members[a + 1:]:
+                row[b] += 1
+
+    sizes = [len(s) for s in sets]
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        if sizes[i]:
+            matrix[i][i] = 1.0
+        for j in range(i + 1, n):
+            inter = intersections[i][j]
+            if inter:
+                matrix[i][j] = matrix[j][i] = inter / (sizes[i] + sizes[j] - inter)
+    return matrix
@@ -0,0 +1,169 @@
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import spotipy
+from .resilience import (
+    REFRESH_WORKERS, REQUEST_RETRIES, REQUEST_TIMEOUT, RESPONSE_CACHE, STALE_AFTER,
+    api_path, get_breaker, hedged, is_upstream_failure, reads_must_be_fresh, record_stale_read
+)
+
+# orjson decodes Spotify responses several times faster than the stdlib; use it when installed
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+# Field projections for the calls the agents make. Only the playlist endpoints
+# accept a `fields` filter; for tracks and search, passing a market drops the
+# ~180-entry available_markets lists from every track and album instead.
+PLAYLIST_ANALYSIS_FIELDS = "name,owner(display_name)"
+PLAYLIST_ITEM_FIELDS = "total,items(track(id,uri,name,artists(id,name)))"
+TRACK_MARKET = "from_token"
+
+# Endpoint groups with their own circuit breaker, by first path segment(s)
+ENDPOINT_GROUPS = {
+    "me/player": "Spotify playback",
+    "me/top": "Spotify personalization",
+    "recommendations": "Spotify personalization",
+    "me/playlists": "Spotify playlists",
+    "playlists": "Spotify playlists",
+    "users": "Spotify playlists",
+    "search": "Spotify catalog",
+    "tracks": "Spotify catalog",
+    "audio-features": "Spotify catalog",
+    "audio-analysis": "Spotify catalog",
+    "artists": "Spotify catalog",
+    "albums": "Spotify catalog",
+}
+
+# Background threads that finish slow reads and refresh the response cache.
+# A read only goes to the pool once it holds a slot, so nothing ever queues there.
+_refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="spotify-refresh")
+_refresh_slots = threading.BoundedSemaphore(REFRESH_WORKERS)
+
+def endpoint_group(url: str) -> str:
+    """Return the endpoint group of a Spotify API URL or path."""
+    parts = api_path(url).split("/")
+    return ENDPOINT_GROUPS.get("/".join(parts[:2])) or ENDPOINT_GROUPS.get(parts[0], "Spotify")
+
+class SpotifyClient(spotipy.Spotify):
+    """spotipy client with faster JSON decoding, transfer stats and degraded-upstream handling.
+
+    spotipy calls `response.json()` on every response; a session response hook
+    swaps that for `json_loads` and records the body size and decode time.
+
+    Every call goes through the circuit breaker of its endpoint group. GET
+    responses are cached: when a cached response exists and the upstream is
+    failing, its breaker is open, or it hasn't answered within `stale_after`
+    seconds, the cached response is served (and recorded as stale) while the
+    request finishes in the background and refreshes the cache. Inside
+    resilience.fresh_reads(), reads skip the cache fallback; every write to a
+    playlist drops that playlist's cached reads. Requests time out after
+    REQUEST_TIMEOUT seconds and aren't retried on 5xx or 429.
+
+    These calls block their thread, so async tools make them with asyncio.to_thread.
+
+    With `hedge` enabled, GET requests (which are idempotent) are hedged: a
+    second attempt is sent when the first is slower than usual for its endpoint
+    group, see resilience.hedged.
+    """
+
+    def __init__(self, *args, stale_after: float = STALE_AFTER, hedge: bool = False, **kwargs):
+        kwargs.setdefault("requests_timeout", REQUEST_TIMEOUT)
+        kwargs.setdefault("retries", REQUEST_RETRIES)
+        kwargs.setdefault("status_retries", 0)
+        super().__init__(*args, **kwargs)
+        self.stale_after = stale_after
+        self.hedge = hedge
+        self.stats = {"requests": 0, "bytes": 0, "decode_seconds": 0.0}
+        # Without a session (requests_session=False) spotipy calls requests.api directly
+        if hasattr(self._session, "hooks"):
+            self._session.hooks["response"].append(self._fast_json_hook)
+
+    def _fast_json_hook(self, response, *args, **kwargs):
+        def decode(**_):
+            start = time.perf_counter()
+            try:
+                return json_loads(content)
+            finally:
+                self.stats["decode_seconds"] += time.perf_counter() - start
+
+        content = response.content
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(content)
+        response.json = decode
+        return response
+
+    def _internal_call(self, method, url, payload, params):
+        group = endpoint_group(url)
+        breaker = get_breaker(group)
+        call = super()._internal_call
+        if method != "GET":
+            try:
+                return breaker.call(call, method, url, payload, params)
+            finally:
+                # Even a failed write may have been applied
+                self._invalidate(url)
+        if self.hedge:
+            call = functools.partial(hedged, group, call)
+
+        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        entry = RESPONSE_CACHE.get(key)
+        if entry is None or reads_must_be_fresh():
+            result = breaker.call(call, method, url, payload, params)
+            RESPONSE_CACHE.put(key, result)
+            return result
+
+        # Wait for an in-flight slot within the same stale_after budget; when
+        # every slot stays busy that long, the upstream is backed up. The slot
+        # is taken before asking the breaker, so a half-open probe it lets
+        # through always gets sent.
+        cached, fetched_at = entry
+        deadline = time.monotonic() + self.stale_after
+        if not _refresh_slots.acquire(timeout=self.stale_after):
+            record_stale_read(fetched_at)
+            return cached
+        if not breaker.allow():
+            _refresh_slots.release()
+            record_stale_read(fetched_at)
+            return cached
+
+        def fetch():
+            try:
+                result = breaker.run(call, method, url, payload, params)
+                RESPONSE_CACHE.put(key, result)
+                return result
+            finally:
+                _refresh_slots.release()
+
+        future = _refresh_pool.submit(fetch)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            # The request keeps running and refreshes the cache when it completes
+            record_stale_read(fetched_at)
+            return cached
+        except Exception as e:
+            if not is_upstream_failure(e):
+                raise
+            record_stale_read(fetched_at)
+            return cached
+
+    def _invalidate(self, url):
+        """Drop the cached reads a write to `url` makes outdated."""
+        parts = api_path(url).split("/")
+        if parts[0] == "playlists" and len(parts) >= 2:
+            RESPONSE_CACHE.invalidate(f"playlists/{parts[1]}")
+        if parts[0] in ("playlists", "users"):
+            # Playlist names, track counts and new playlists show up in the user's playlist list
+            RESPONSE_CACHE.invalidate("me/playlists")
+
+    def reset_stats(self):
+        """Reset the transfer stats and return the previous values."""
+        stats = self.stats
+        self.stats = {"requests": 0, "bytes": 0, "decode_seconds": 0.0}
+        return stats
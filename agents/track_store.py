@@ -0,0 +1,146 @@
+import math
+import sys
+from array import array
+
+# Audio features kept per track, packed as float32 in this order
+FEATURE_FIELDS = (
+    "danceability", "energy", "valence", "tempo", "acousticness", "instrumentalness",
+    "speechiness", "liveness", "loudness", "key", "mode", "time_signature"
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_FIELDS)}
+
+def _intern(value):
+    return sys.intern(value) if value else ""
+
+def pack_features(features):
+    """Pack a Spotify audio features dict into a float32 array (NaN for missing values)."""
+    return array("f", [
+        features.get(name) if features and features.get(name) is not None else math.nan
+        for name in FEATURE_FIELDS
+    ])
+
+class CompactTrack:
+    """A track reduced to the fields the agents read.
+
+    Repeated strings (artist and album names and IDs) are interned so that every
+    track by the same artist shares one string object.
+    """
+
+    __slots__ = ("id", "name", "artist", "artist_id", "album", "duration_ms", "popularity", "features")
+
+    def __init__(self, id, name, artist="", artist_id="", album="", duration_ms=0, popularity=0, features=None):
+        self.id = id
+        self.name = name
+        self.artist = _intern(artist)
+        self.artist_id = _intern(artist_id)
+        self.album = _intern(album)
+        self.duration_ms = duration_ms
+        self.popularity = popularity
+        self.features = features
+
+    @classmethod
+    def from_api(cls, track, features=None):
+        """Build a compact track from a spotipy track object and optional audio features."""
+        artist = track['artists'][0] if track.get('artists') else {}
+        return cls(
+            id=track['id'],
+            name=track.get('name', ""),
+            artist=artist.get('name', ""),
+            artist_id=artist.get('id', ""),
+            album=(track.get('album') or {}).get('name', ""),
+            duration_ms=track.get('duration_ms', 0),
+            popularity=track.get('popularity', 0),
+            features=pack_features(features) if features else None
+        )
+
+    @property
+    def uri(self):
+        return f"spotify:track:{self.id}"
+
+    def feature(self, name):
+        """Return a single audio feature, or None if it's unknown."""
+        if self.features is None:
+            return None
+        value = self.features[FEATURE_INDEX[name]]
+        return None if math.isnan(value) else value
+
+    def __repr__(self):
+        return f"CompactTrack({self.id!r}, {self.name!r}, artist={self.artist!r})"
+
+class TrackStore:
+    """Columnar store for a large number of tracks.
+
+    Each field lives in its own list or typed array and a track is just a row
+    number, so per-track overhead is a few pointers and packed numbers instead of
+    a tree of dicts. Audio features are one flat float32 array with
+    len(FEATURE_FIELDS) values per row.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.ids = []
+        self.names = []
+        self.artists = []
+        self.artist_ids = []
+        self.albums = []
+        self.durations = array("I")
+        self.popularity = array("B")
+        self.features = array("f")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, track_id):
+        return track_id in self.rows
+
+    def add(self, track, features=None) -> int:
+        """Add (or update) a track from a spotipy track object and return its row number."""
+        track_id = track['id']
+        row = self.rows.get(track_id)
+        if row is None:
+            row = len(self.ids)
+            self.rows[track_id] = row
+            self.ids.append(track_id)
+            self.names.append(track.get('name', ""))
+            artist = track['artists'][0] if track.get('artists') else {}
+            self.artists.append(_intern(artist.get('name')))
+            self.artist_ids.append(_intern(artist.get('id')))
+            self.albums.append(_intern((track.get('album') or {}).get('name')))
+            self.durations.append(track.get('duration_ms') or 0)
+            self.popularity.append(track.get('popularity') or 0)
+            self.features.extend(pack_features(None))
+        if features:
+            self.set_features(track_id, features)
+        return row
+
+    def set_features(self, track_id, features):
+        """Store audio features for a track that is already in the store."""
+        start = self.rows[track_id] * len(FEATURE_FIELDS)
+        self.features[start:start + len(FEATURE_FIELDS)] = pack_features(features)
+
+    def feature(self, row, name):
+        """Return one audio feature of a row, or None if it's unknown."""
+        value = self.features[row * len(FEATURE_FIELDS) + FEATURE_INDEX[name]]
+        return None if math.isnan(value) else value
+
+    def column(self, name):
+        """Return one audio feature for every row, as a float32 array (NaN where unknown)."""
+        return self.features[FEATURE_INDEX[name]::len(FEATURE_FIELDS)]
+
+    def get(self, track_id):
+        """Materialise a stored track as a CompactTrack, or None if it isn't stored."""
+        row = self.rows.get(track_id)
+        if row is None:
+            return None
+        start = row * len(FEATURE_FIELDS)
+        features = self.features[start:start + len(FEATURE_FIELDS)]
+        return CompactTrack(
+            id=track_id,
+            name=self.names[row],
+            artist=self.artists[row],
+            artist_id=self.artist_ids[row],
+            album=self.albums[row],
+            duration_ms=self.durations[row],
+            popularity=self.popularity[row],
+            features=None if all(math.isnan(v) for v in features) else features
+        )
@@ -1,8 +1,8 @@
 import os
 import sys
-import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
+from .spotify_client import SpotifyClient
 
 # Load environment variables
 load_dotenv()
@@ -12,6 +12,9 @@ SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://localhost:8888/callback")
 
+# Send a second attempt for slow read requests (see SpotifyClient)
+SPOTIFY_HEDGE_REQUESTS = os.getenv("SPOTIFY_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+
 # Spotify authentication scope
 SCOPE = "user-read-private user-read-email user-read-playback-state user-modify-playback-state user-read-currently-playing playlist-read-private playlist-modify-private playlist-modify-public user-top-read"
 
@@ -38,4 +41,4 @@ def get_spotify_client():
         # For MCP, we need to return a proper error message as JSON
         raise Exception("Spotify authentication required. Please run 'python test_auth.py' in your terminal to authenticate.")
     
-    return spotipy.Spotify(auth=token_info['access_token']) 
\ No newline at end of file
+    return SpotifyClient(auth=token_info['access_token'], hedge=SPOTIFY_HEDGE_REQUESTS) 
\ No newline at end of file
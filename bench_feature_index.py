@@ -0,0 +1,45 @@
+import argparse
+import random
+import time
+from agents.feature_index import FeatureIndex, parse_key
+from agents.track_store import TrackStore
+
+QUERIES = [
+    ("120-128 BPM, A minor, energy > 0.7", dict(ranges={"tempo": (120, 128), "energy": (0.7, None)}, key=parse_key("A minor"))),
+    ("120-128 BPM, harmonic to 8A", dict(ranges={"tempo": (120, 128)}, key="8A", harmonic=True)),
+    ("energy > 0.8, valence < 0.3", dict(ranges={"energy": (0.8, None), "valence": (None, 0.3)})),
+    ("danceability 0.6-0.9, 100-140 BPM", dict(ranges={"danceability": (0.6, 0.9), "tempo": (100, 140)})),
+]
+
+def build_store(count):
+    rng = random.Random(0)
+    store = TrackStore()
+    for i in range(count):
+        store.add(
+            {"id": f"track{i:017d}", "name": f"Track {i}", "artists": [{"id": f"artist{i % 5000}", "name": f"Artist {i % 5000}"}]},
+            {"tempo": rng.uniform(60, 180), "energy": rng.random(), "valence": rng.random(),
+             "danceability": rng.random(), "key": rng.randrange(12), "mode": rng.randrange(2)}
+        )
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure FeatureIndex build and range query time.")
+    parser.add_argument("--tracks", type=int, default=100_000, help="Number of tracks in the library")
+    parser.add_argument("--rounds", type=int, default=20, help="Repetitions per query")
+    args = parser.parse_args()
+
+    store = build_store(args.tracks)
+    start = time.perf_counter()
+    index = FeatureIndex(store)
+    print(f"Built index over {len(store)} tracks in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    print(f"{'query':<38} {'matches':>8} {'ms/query':>10}")
+    for name, query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            rows = index.query(**query)
+        elapsed = (time.perf_counter() - start) / args.rounds
+        print(f"{name:<38} {len(rows):>8} {elapsed * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
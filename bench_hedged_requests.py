@@ -0,0 +1,49 @@
+import argparse
+import random
+import time
+from agents import resilience
+from stub_spotify_server import StubSpotify
+
+def heavy_tailed_latency(rng, slow_fraction):
+    """Mostly 10-30 ms, with an occasional 300-1000 ms straggler."""
+    if rng.random() < slow_fraction:
+        return rng.uniform(0.3, 1.0)
+    return rng.uniform(0.01, 0.03)
+
+def percentile(latencies, q):
+    ordered = sorted(latencies)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+def run(stub, hedge, requests):
+    """Fetch a track `requests` times and return the latencies and the number of upstream requests made."""
+    resilience.LATENCY_TRACKERS.clear()
+    resilience.HEDGE_BUDGET = resilience.HedgeBudget()
+    sp = stub.client(hedge=hedge, stale_after=10)
+    track_id = stub.tracks[0]["id"]
+    start_requests = stub.requests
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        sp.track(track_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies, stub.requests - start_requests
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tail latency with and without request hedging against a heavy-tailed stub.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per configuration")
+    parser.add_argument("--slow-fraction", type=float, default=0.03, help="Share of responses that are stragglers")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with StubSpotify(tracks=10) as stub:
+        stub.latency = lambda: heavy_tailed_latency(rng, args.slow_fraction)
+        print(f"{'hedging':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'extra requests':>15}")
+        for hedge in (False, True):
+            latencies, upstream = run(stub, hedge, args.requests)
+            extra = (upstream - args.requests) / args.requests
+            print(f"{'on' if hedge else 'off':<8} "
+                  f"{percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.0f} {max(latencies) * 1000:>8.0f} {extra:>15.1%}")
+
+if __name__ == "__main__":
+    main()
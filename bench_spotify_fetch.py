@@ -0,0 +1,43 @@
+import argparse
+import json
+import time
+from agents.spotify_client import PLAYLIST_ITEM_FIELDS, orjson
+from stub_spotify_server import StubSpotify
+
+def fetch_pages(sp, rounds, fields=None):
+    """Fetch a 100-track playlist page `rounds` times and return the client's transfer stats."""
+    sp.reset_stats()
+    for _ in range(rounds):
+        sp.playlist_items("stub", fields=fields, limit=100, offset=0)
+    return sp.reset_stats()
+
+def time_decode(loads, body, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        loads(body)
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes transferred and decode time per 100-track playlist page.")
+    parser.add_argument("--rounds", type=int, default=50, help="Pages fetched per configuration")
+    args = parser.parse_args()
+
+    with StubSpotify(tracks=100) as stub:
+        sp = stub.client()
+        print(f"JSON decoder in use: {'orjson' if orjson else 'json (install orjson for faster decoding)'}\n")
+        print(f"{'page':<12} {'bytes/page':>12} {'decode ms/page':>16}")
+        bodies = {}
+        for name, fields in [("full", None), ("projected", PLAYLIST_ITEM_FIELDS)]:
+            stats = fetch_pages(sp, args.rounds, fields)
+            print(f"{name:<12} {stats['bytes'] / stats['requests']:>12.0f} {stats['decode_seconds'] / stats['requests'] * 1000:>16.3f}")
+            page = sp.playlist_items("stub", fields=fields, limit=100, offset=0)
+            bodies[name] = json.dumps(page).encode()
+
+    decoders = [("json", json.loads)] + ([("orjson", orjson.loads)] if orjson else [])
+    print(f"\n{'decoder':<8} {'page':<12} {'decode ms/page':>16}")
+    for decoder, loads in decoders:
+        for name, body in bodies.items():
+            print(f"{decoder:<8} {name:<12} {time_decode(loads, body, args.rounds) * 1000:>16.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import random
+import sys
+from array import array
+from agents.track_store import CompactTrack, TrackStore
+
+# Roughly what Spotify returns in available_markets for a widely released track
+MARKETS = [f"{a}{b}" for a in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" for b in "ABCDEFG"][:180]
+
+def make_payload(i, rng, fresh=True):
+    """Build a synthetic spotipy track object and audio features dict shaped like the real API payloads."""
+    artist_id = f"artist{i % 5000:017d}"
+    album_id = f"album{i % 20000:018d}"
+    track_id = f"track{i:017d}"
+    artist = {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+        "id": artist_id,
+        "name": f"Artist {i % 5000}",
+        "type": "artist",
+        "uri": f"spotify:artist:{artist_id}"
+    }
+    track = {
+        "album": {
+            "album_type": "album",
+            "artists": [artist],
+            "available_markets": MARKETS,
+            "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+            "href": f"https://api.spotify.com/v1/albums/{album_id}",
+            "id": album_id,
+            "images": [
+                {"height": size, "url": f"https://i.scdn.co/image/{album_id}{size}", "width": size}
+                for size in (640, 300, 64)
+            ],
+            "name": f"Album {i % 20000}",
+            "release_date": "2020-01-01",
+            "release_date_precision": "day",
+            "total_tracks": 12,
+            "type": "album",
+            "uri": f"spotify:album:{album_id}"
+        },
+        "artists": [artist],
+        "available_markets": MARKETS,
+        "disc_number": 1,
+        "duration_ms": rng.randint(120000, 400000),
+        "explicit": False,
+        "external_ids": {"isrc": f"USRC1{i:07d}"},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+        "id": track_id,
+        "is_local": False,
+        "name": f"Track {i}",
+        "popularity": rng.randint(0, 100),
+        "preview_url": None,
+        "track_number": i % 12 + 1,
+        "type": "track",
+        "uri": f"spotify:track:{track_id}"
+    }
+    features = {
+        "danceability": rng.random(), "energy": rng.random(), "key": rng.randrange(12),
+        "loudness": rng.uniform(-30, 0), "mode": rng.randrange(2), "speechiness": rng.random(),
+        "acousticness": rng.random(), "instrumentalness": rng.random(), "liveness": rng.random(),
+        "valence": rng.random(), "tempo": rng.uniform(60, 180), "type": "audio_features",
+        "id": track_id, "uri": f"spotify:track:{track_id}",
+        "track_href": f"https://api.spotify.com/v1/tracks/{track_id}",
+        "analysis_url": f"https://api.spotify.com/v1/audio-analysis/{track_id}",
+        "duration_ms": track["duration_ms"], "time_signature": 4
+    }
+    if not fresh:
+        return track, features
+    # Round-trip through JSON so every payload owns its objects, as a decoded response would
+    return json.loads(json.dumps(track)), json.loads(json.dumps(features))
+
+def deep_sizeof(root):
+    """Total size in bytes of every object reachable from `root`, counting shared objects once."""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, (bool, type)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(obj)
+        elif isinstance(obj, (str, int, float, array)):
+            continue
+        elif hasattr(type(obj), "__slots__"):
+            stack.extend(getattr(obj, name) for name in type(obj).__slots__ if hasattr(obj, name))
+        else:
+            stack.append(vars(obj))
+    return total
+
+def build_raw(count):
+    rng = random.Random(0)
+    return [make_payload(i, rng) for i in range(count)]
+
+def build_slots(count):
+    rng = random.Random(0)
+    return {
+        track["id"]: CompactTrack.from_api(track, features)
+        for track, features in (make_payload(i, rng, fresh=False) for i in range(count))
+    }
+
+def build_store(count):
+    rng = random.Random(0)
+    store = TrackStore()
+    for i in range(count):
+        track, features = make_payload(i, rng, fresh=False)
+        store.add(track, features)
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory per cached track for each track representation.")
+    parser.add_argument("--tracks", type=int, default=100_000, help="Number of tracks for the compact representations")
+    parser.add_argument("--raw-tracks", type=int, default=10_000, help="Number of tracks for raw JSON dicts (they need ~100x more memory)")
+    args = parser.parse_args()
+
+    results = [
+        ("raw spotipy dicts", args.raw_tracks, deep_sizeof(build_raw(args.raw_tracks))),
+        ("CompactTrack (__slots__)", args.tracks, deep_sizeof(build_slots(args.tracks))),
+        ("TrackStore (columnar)", args.tracks, deep_sizeof(build_store(args.tracks))),
+    ]
+
+    print(f"{'representation':<26} {'tracks':>8} {'total MB':>10} {'bytes/track':>12}")
+    for name, count, size in results:
+        print(f"{name:<26} {count:>8} {size / 1e6:>10.1f} {size / count:>12.0f}")
+
+if __name__ == "__main__":
+    main()
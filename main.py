@@ -10,9 +10,14 @@ control_playback = orchestrator.control_playback
 get_recommendations = orchestrator.get_recommendations
 analyze_playlist = orchestrator.analyze_playlist
 create_ai_playlist = orchestrator.create_ai_playlist
+reorder_playlist = orchestrator.reorder_playlist
+filter_playlist = orchestrator.filter_playlist
+compare_playlists = orchestrator.compare_playlists
 get_top_items = orchestrator.get_top_items
 analyze_track = orchestrator.analyze_track
+find_tracks_by_features = orchestrator.find_tracks_by_features
 analyze_and_recommend = orchestrator.analyze_and_recommend
+profile_tools = orchestrator.profile_tools
 
 # Run the server
 if __name__ == "__main__":
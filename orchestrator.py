@@ -1,52 +1,109 @@
+from typing import Optional
 from mcp.server.fastmcp import FastMCP
-from agents import playback_agent, discovery_agent, playlist_agent, insights_agent, analysis_agent
+from agents import playback_agent, discovery_agent, playlist_agent, insights_agent, analysis_agent, admin_agent
+from agents.profiler import profiled
+from agents.resilience import mark_stale
 
 # Initialize FastMCP server
 mcp = FastMCP("spotify-orchestrator")
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def get_current_track() -> str:
     """Get information about the currently playing track on Spotify."""
     # Forward to playback agent
     return await playback_agent.get_current_track()
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def play_track(query: str) -> str:
     """Play a track on Spotify by searching for it."""
     return await playback_agent.play_track(query)
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def control_playback(action: str) -> str:
     """Control Spotify playback with actions like play, pause, next, previous."""
     return await playback_agent.control_playback(action)
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def get_recommendations(seed_tracks: str = None, seed_artists: str = None, mood: str = None) -> str:
     """Get personalized music recommendations."""
     return await discovery_agent.get_recommendations(seed_tracks, seed_artists, mood)
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def analyze_playlist(playlist_url: str) -> str:
     """Analyze a Spotify playlist and provide insights."""
     return await playlist_agent.analyze_playlist(playlist_url)
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def create_ai_playlist(prompt: str, name: str = None) -> str:
     """Create a Spotify playlist based on an AI-interpreted prompt."""
     return await playlist_agent.create_ai_playlist(prompt, name)
 
 @mcp.tool()
+@profiled
+@mark_stale
+async def reorder_playlist(playlist_url: str, sort_by: str = "tempo", descending: bool = False) -> str:
+    """Reorder a Spotify playlist by tempo, energy, danceability, valence, acousticness or along an energy arc."""
+    return await playlist_agent.reorder_playlist(playlist_url, sort_by, descending)
+
+@mcp.tool()
+@profiled
+@mark_stale
+async def filter_playlist(playlist_url: str, min_tempo: float = None, max_tempo: float = None,
+                          min_energy: float = None, max_energy: float = None) -> str:
+    """Remove tracks outside a tempo or energy range from a Spotify playlist."""
+    return await playlist_agent.filter_playlist(playlist_url, min_tempo, max_tempo, min_energy, max_energy)
+
+@mcp.tool()
+@profiled
+@mark_stale
+async def compare_playlists(playlist_urls: str = None, duplicate_threshold: float = 0.5) -> str:
+    """Compare many Spotify playlists and report near-duplicates and outliers."""
+    return await playlist_agent.compare_playlists(playlist_urls, duplicate_threshold)
+
+@mcp.tool()
+@profiled
+@mark_stale
 async def get_top_items(item_type: str = "tracks", time_range: str = "medium_term") -> str:
     """Get your top tracks or artists on Spotify."""
     return await insights_agent.get_top_items(item_type, time_range)
 
 @mcp.tool()
+@profiled
+@mark_stale
 async def analyze_track(track_id_or_name: str) -> str:
     """Analyze audio features of a track and provide insights."""
     return await analysis_agent.analyze_track(track_id_or_name)
 
+@mcp.tool()
+@profiled
+@mark_stale
+async def find_tracks_by_features(min_tempo: float = None, max_tempo: float = None, key: str = None,
+                                  harmonic: bool = False, min_energy: float = None, max_energy: float = None,
+                                  min_valence: float = None, max_valence: float = None,
+                                  min_danceability: float = None, max_danceability: float = None,
+                                  limit: int = 20, refresh: bool = False) -> str:
+    """Find tracks in your playlists by tempo, key (with optional harmonic neighbours), energy, valence and danceability ranges."""
+    return await analysis_agent.find_tracks_by_features(
+        min_tempo, max_tempo, key, harmonic, min_energy, max_energy,
+        min_valence, max_valence, min_danceability, max_danceability, limit, refresh
+    )
+
 # Advanced cross-agent tools
 @mcp.tool()
+@profiled
+@mark_stale
 async def analyze_and_recommend(track_id_or_name: str) -> str:
     """Analyze a track and find similar recommendations."""
     # First analyze the track
@@ -59,4 +116,11 @@ async def analyze_and_recommend(track_id_or_name: str) -> str:
         recommendations = await discovery_agent.get_recommendations(seed_tracks=track_name)
         return f"{analysis_result}\n\n--- SIMILAR TRACKS ---\n\n{recommendations}"
     else:
-        return f"Could not analyze track. {analysis_result}" 
\ No newline at end of file
+        return f"Could not analyze track. {analysis_result}" 
+
+# Admin tools
+@mcp.tool()
+async def profile_tools(action: str = "start", calls: Optional[int] = 10, seconds: Optional[float] = None,
+                        stall_threshold_ms: float = 100, interval_ms: float = 5) -> str:
+    """Capture a sampling profile (collapsed stacks and event-loop stalls) of the next tool calls. Actions: start, stop, status. calls=0 or null means no call limit."""
+    return await admin_agent.profile_tools(action, calls, seconds, stall_threshold_ms, interval_ms)
@@ -0,0 +1,151 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from bench_track_memory import make_payload
+
+def parse_fields(fields):
+    """Parse a Spotify `fields` filter such as "total,items(track(id,name))" into a nested dict."""
+    def parse(pos):
+        spec = {}
+        name = ""
+        while pos < len(fields):
+            char = fields[pos]
+            if char == ",":
+                if name:
+                    spec[name] = None
+                name = ""
+            elif char == "(":
+                spec[name], pos = parse(pos + 1)
+                name = ""
+            elif char == ")":
+                break
+            else:
+                name += char
+            pos += 1
+        if name:
+            spec[name] = None
+        return spec, pos
+    return parse(0)[0]
+
+def project(value, spec):
+    """Apply a parsed fields filter to a decoded JSON value, like the Spotify API does."""
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [project(v, spec) for v in value]
+    if isinstance(value, dict):
+        return {k: project(value[k], sub) for k, sub in spec.items() if k in value}
+    return value
+
+class StubSpotify:
+    """A local stand-in for the Spotify Web API serving synthetic playlists.
+
+    Serves GET /v1/playlists/<id>, /v1/playlists/<id>/items, /v1/tracks/<id>,
+    /v1/audio-features and /v1/artists with `fields`, `limit` and `offset` support. Writes to
+    /v1/playlists/<id>/items only bump the snapshot_id. Set `latency` (a callable returning seconds)
+    or `fail` (a callable returning an HTTP status, or None) to inject faults.
+    """
+
+    def __init__(self, tracks=500):
+        rng = random.Random(0)
+        payloads = [make_payload(i, rng) for i in range(tracks)]
+        self.tracks = [track for track, _ in payloads]
+        self.features = {features["id"]: features for _, features in payloads}
+        self.artists = {
+            artist["id"]: dict(artist, genres=[f"genre {n % 10}", f"genre {n % 7 + 10}"], popularity=n % 100)
+            for n, artist in enumerate({a["id"]: a for t in self.tracks for a in t["artists"]}.values())
+        }
+        self.latency = None
+        self.fail = None
+        self.requests = 0
+        self.snapshot = 1
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.respond(stub.route)
+
+            def do_POST(self):
+                self.respond(stub.write)
+
+            do_PUT = do_DELETE = do_POST
+
+            def respond(self, route):
+                stub.requests += 1
+                if stub.latency:
+                    threading.Event().wait(stub.latency())
+                status = stub.fail() if stub.fail else None
+                if status:
+                    self.send_body(status, {"error": {"status": status, "message": "injected failure"}})
+                    return
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                body = route(url.path, query)
+                self.send_body(200 if body is not None else 404, body or {"error": {"status": 404, "message": "not found"}})
+
+            def send_body(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.prefix = f"http://127.0.0.1:{self.server.server_port}/v1/"
+
+    def page(self, offset, limit):
+        items = [{"added_at": "2024-01-01T00:00:00Z", "is_local": False, "track": t}
+                 for t in self.tracks[offset:offset + limit]]
+        return {"href": "", "items": items, "limit": limit, "offset": offset, "next": None,
+                "previous": None, "total": len(self.tracks)}
+
+    def route(self, path, query):
+        parts = path.strip("/").split("/")
+        if len(parts) >= 3 and parts[1] == "playlists":
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+            if len(parts) == 4 and parts[3] in ("tracks", "items"):
+                body = self.page(offset, limit)
+            else:
+                body = {"id": parts[2], "name": f"Playlist {parts[2]}", "snapshot_id": str(self.snapshot),
+                        "owner": {"display_name": "stub", "id": "stub"}, "tracks": self.page(0, 100)}
+        elif len(parts) == 3 and parts[1] == "tracks":
+            body = next((t for t in self.tracks if t["id"] == parts[2]), None)
+        elif len(parts) == 2 and parts[1] == "audio-features":
+            body = {"audio_features": [self.features.get(i) for i in query.get("ids", "").split(",")]}
+        elif len(parts) == 2 and parts[1] == "artists":
+            body = {"artists": [self.artists.get(i) for i in query.get("ids", "").split(",")]}
+        else:
+            return None
+        return project(body, parse_fields(query["fields"])) if "fields" in query else body
+
+    def write(self, path, query):
+        parts = path.strip("/").split("/")
+        if len(parts) == 4 and parts[1] == "playlists" and parts[3] in ("tracks", "items"):
+            self.snapshot += 1
+            return {"snapshot_id": str(self.snapshot)}
+        return None
+
+    def client(self, **kwargs):
+        """Return a SpotifyClient pointed at this stub, with the production retry and timeout settings."""
+        from agents.spotify_client import SpotifyClient
+        sp = SpotifyClient(auth="stub", **kwargs)
+        sp.prefix = self.prefix
+        return sp
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
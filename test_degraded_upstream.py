@@ -0,0 +1,118 @@
+import asyncio
+import time
+import orchestrator
+from agents import playlist_agent, resilience
+from agents.playlist_writer import fetch_playlist_items
+from stub_spotify_server import StubSpotify
+
+# Longest a tool call may take while Spotify is degraded (seconds)
+MAX_DEGRADED_LATENCY = 1.0
+# Longest the event loop may go without running while tools wait on Spotify (seconds)
+MAX_LOOP_STALL = 0.05
+
+async def timed_calls(tool, count, *args):
+    """Call a tool `count` times and return (latencies, results).
+
+    Meanwhile a ticker checks that the event loop keeps running, so other
+    tool calls are served while these wait on Spotify.
+    """
+    stalls = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            stalls.append(now - last - 0.01)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    latencies, results = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        results.append(await tool(*args))
+        latencies.append(time.perf_counter() - start)
+    task.cancel()
+    assert max(stalls, default=0) < MAX_LOOP_STALL, max(stalls)
+    return latencies, results
+
+def test_tail_latency_bounded_during_outage():
+    resilience.BREAKERS.clear()
+    resilience.RESPONSE_CACHE.clear()
+    reset_timeout = resilience.BREAKER_RESET_TIMEOUT
+    resilience.BREAKER_RESET_TIMEOUT = 0.5
+
+    with StubSpotify(tracks=100) as stub:
+        original_client = playlist_agent.get_spotify_client
+        playlist_agent.get_spotify_client = lambda: stub.client(stale_after=0.2)
+        try:
+            # Healthy: fresh answers, which also fill the cache
+            _, results = asyncio.run(timed_calls(orchestrator.analyze_playlist, 1, "cached"))
+            assert "Playlist Analysis" in results[0] and "[STALE]" not in results[0]
+
+            # Slow upstream: cached answers after stale_after, marked as stale
+            stub.latency = lambda: 3.0
+            latencies, results = asyncio.run(timed_calls(orchestrator.analyze_playlist, 5, "cached"))
+            assert max(latencies) < MAX_DEGRADED_LATENCY, latencies
+            assert all("Playlist Analysis" in r and "[STALE]" in r for r in results)
+
+            # Failing upstream: the breaker opens and calls stop reaching Spotify
+            stub.latency = None
+            stub.fail = lambda: 503
+            latencies, results = asyncio.run(timed_calls(orchestrator.analyze_playlist, 20, "cached"))
+            assert max(latencies) < MAX_DEGRADED_LATENCY, latencies
+            assert all("[STALE]" in r for r in results)
+            assert resilience.get_breaker("Spotify playlists").state == "open"
+            requests = stub.requests
+            asyncio.run(timed_calls(orchestrator.analyze_playlist, 5, "cached"))
+            assert stub.requests == requests
+
+            # Nothing cached to fall back on: fail fast with an error instead of waiting
+            latencies, results = asyncio.run(timed_calls(orchestrator.analyze_playlist, 3, "uncached"))
+            assert max(latencies) < MAX_DEGRADED_LATENCY, latencies
+            assert all(r.startswith("Error") for r in results)
+
+            # Recovery: once the slow requests still in flight have drained, half-open
+            # probes succeed and answers are fresh again
+            stub.fail = None
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                time.sleep(resilience.BREAKER_RESET_TIMEOUT)
+                _, results = asyncio.run(timed_calls(orchestrator.analyze_playlist, 1, "cached"))
+                if "[STALE]" not in results[0]:
+                    break
+            assert "[STALE]" not in results[0]
+            assert resilience.get_breaker("Spotify playlists").state == "closed"
+        finally:
+            playlist_agent.get_spotify_client = original_client
+            resilience.BREAKER_RESET_TIMEOUT = reset_timeout
+
+def test_writes_never_build_on_stale_reads():
+    resilience.BREAKERS.clear()
+    resilience.RESPONSE_CACHE.clear()
+
+    with StubSpotify(tracks=150) as stub:
+        sp = stub.client(stale_after=0.2)
+        items, snapshot_id = asyncio.run(fetch_playlist_items(sp, "grows"))
+        assert len(items) == 150
+
+        # The playlist changes elsewhere and Spotify slows down: a plain read answers
+        # from cache, a read that feeds a write waits for the current contents
+        stub.tracks.append(stub.tracks[0])
+        stub.latency = lambda: 0.5
+        items, _ = asyncio.run(fetch_playlist_items(sp, "grows"))
+        assert len(items) == 150
+        items, _ = asyncio.run(fetch_playlist_items(sp, "grows", fresh=True))
+        assert len(items) == 151
+
+        # A write drops the playlist's cached reads, so even a slow plain read sees the new snapshot
+        stub.latency = None
+        result = sp.playlist_add_items("grows", ["spotify:track:0"])
+        stub.latency = lambda: 0.5
+        items, snapshot_id = asyncio.run(fetch_playlist_items(sp, "grows"))
+        assert snapshot_id == result["snapshot_id"]
+
+if __name__ == "__main__":
+    test_tail_latency_bounded_during_outage()
+    test_writes_never_build_on_stale_reads()
+    print("Tail latency stayed bounded during the injected outages, and writes only used fresh reads.")
@@ -0,0 +1,102 @@
+import asyncio
+import random
+from agents.playlist_writer import PlaylistWriter, PlaylistWriteError, count_moves, plan_moves
+
+def apply_reorder(items, range_start, insert_before):
+    """Apply a single-item Spotify reorder (range_length=1) to a list, in place."""
+    item = items.pop(range_start)
+    items.insert(insert_before - 1 if range_start < insert_before else insert_before, item)
+
+def longest_increasing_subsequence(values):
+    lengths = []
+    for k, value in enumerate(values):
+        lengths.append(1 + max((lengths[j] for j in range(k) if values[j] < value), default=0))
+    return max(lengths, default=0)
+
+class FakePlaylist:
+    """Applies playlist writes to a list, failing the add requests listed in `fail_adds`."""
+
+    def __init__(self, uris, fail_adds=()):
+        self.uris = list(uris)
+        self.fail_adds = set(fail_adds)
+        self.adds = 0
+        self.snapshot = 0
+
+    def result(self):
+        self.snapshot += 1
+        return {"snapshot_id": str(self.snapshot)}
+
+    def playlist_replace_items(self, playlist_id, items):
+        assert all(uri and uri.startswith("spotify:track:") for uri in items)
+        self.uris = list(items)
+        return self.result()
+
+    def playlist_add_items(self, playlist_id, items):
+        self.adds += 1
+        if self.adds in self.fail_adds:
+            raise Exception("http status: 503")
+        self.uris.extend(items)
+        return self.result()
+
+    def playlist_reorder_items(self, playlist_id, range_start, insert_before, snapshot_id=None):
+        apply_reorder(self.uris, range_start, insert_before)
+        return self.result()
+
+def test_plan_moves_applies_permutations():
+    rng = random.Random(0)
+    for n in list(range(6)) + [rng.randint(6, 300) for _ in range(500)]:
+        order = list(range(n))
+        rng.shuffle(order)
+        items = list(range(n))
+        moves = plan_moves(order)
+        for range_start, insert_before in moves:
+            apply_reorder(items, range_start, insert_before)
+        assert items == order, order
+        assert len(moves) == count_moves(order)
+        if n <= 60:
+            assert len(moves) == n - longest_increasing_subsequence(order)
+
+def test_plan_moves_nearly_sorted():
+    rng = random.Random(1)
+    for n in (10, 100, 1000):
+        order = list(range(n))
+        for _ in range(3):
+            i, j = rng.randrange(n), rng.randrange(n)
+            order.insert(j, order.pop(i))
+        items = list(range(n))
+        for range_start, insert_before in plan_moves(order):
+            apply_reorder(items, range_start, insert_before)
+        assert items == order
+
+def test_reorder_moves_local_files():
+    uris = [f"spotify:track:{i}" for i in range(300)]
+    uris[250] = "spotify:local:artist:album:title:180"
+    uris[10] = None
+    order = list(reversed(range(300)))
+    sp = FakePlaylist(uris)
+    assert asyncio.run(PlaylistWriter(sp, "playlist").reorder(uris, order)) == "move"
+    assert sp.uris == [uris[i] for i in order]
+
+def test_failed_rewrite_restores_playlist():
+    uris = [f"spotify:track:{i}" for i in range(300)]
+    order = list(reversed(range(300)))
+
+    sp = FakePlaylist(uris)
+    assert asyncio.run(PlaylistWriter(sp, "playlist").reorder(uris, order)) == "replace"
+    assert sp.uris == [uris[i] for i in order]
+
+    # The second append fails: the playlist goes back to its original order
+    sp = FakePlaylist(uris, fail_adds={2})
+    try:
+        asyncio.run(PlaylistWriter(sp, "playlist").reorder(uris, order))
+        assert False, "expected PlaylistWriteError"
+    except PlaylistWriteError as e:
+        assert "restored" in str(e)
+    assert sp.uris == uris
+
+if __name__ == "__main__":
+    test_plan_moves_applies_permutations()
+    test_plan_moves_nearly_sorted()
+    test_reorder_moves_local_files()
+    test_failed_rewrite_restores_playlist()
+    print("Playlist writer tests passed.")